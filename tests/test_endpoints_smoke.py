@@ -29,3 +29,16 @@ def test_download_not_found(client):
     rv = client.get("/download/nonexistent.file")
     # either redirect back to generate page or 404
     assert rv.status_code in (302, 404)
+
+
+def test_dashboard_snapshot(client):
+    rv = client.get("/api/test/snapshot?days=3")
+    assert rv.status_code == 200
+    data = rv.get_json()
+    assert set(data) == {"laatste", "totaal", "aggregated", "historie"}
+    assert len(data["aggregated"]) == 3
+    # an unchanged log is answered with 304 when the client sends the ETag back
+    rv = client.get(
+        "/api/test/snapshot?days=3", headers={"If-None-Match": rv.headers["ETag"]}
+    )
+    assert rv.status_code == 304
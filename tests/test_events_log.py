@@ -0,0 +1,116 @@
+import datetime
+import importlib
+import json
+import os
+
+import pytest
+
+appmod = importlib.import_module("web.app")
+
+T0 = datetime.datetime(2026, 1, 1)
+
+
+def _lines(start, stop):
+    return "".join(
+        json.dumps(
+            {
+                "tijdstip": (T0 + datetime.timedelta(seconds=i)).isoformat(),
+                "filename": f"f{i}.xml",
+                "success": True,
+            }
+        )
+        + "\n"
+        for i in range(start, stop)
+    )
+
+
+def _names(events):
+    return [e["filename"] for e in events]
+
+
+def _newest_first(start, stop):
+    return [f"f{i}.xml" for i in reversed(range(start, stop))]
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    path = tmp_path / "xml_events.jsonl"
+    monkeypatch.setattr(appmod, "EVENTS_FILE", path)
+    monkeypatch.setattr(appmod, "_XML_EVENTS_CACHE", {})
+    return path
+
+
+def test_append_parses_only_the_new_lines(log):
+    log.write_text(_lines(0, 3))
+    first = appmod._read_xml_events()
+    assert _names(first) == _newest_first(0, 3)
+
+    with open(log, "a") as fh:
+        fh.write(_lines(3, 5))
+    merged = appmod._read_xml_events()
+    assert _names(merged) == _newest_first(0, 5)
+    # the cached dicts are reused, not parsed again
+    assert all(a is b for a, b in zip(merged[2:], first))
+
+
+def test_partial_last_line_is_not_cached(log):
+    full = _lines(0, 3)
+    log.write_text(full[:-10])
+    assert _names(appmod._read_xml_events()) == _newest_first(0, 2)
+    assert appmod._XML_EVENTS_CACHE == {}
+
+    with open(log, "a") as fh:
+        fh.write(full[-10:])
+    assert _names(appmod._read_xml_events()) == _newest_first(0, 3)
+
+
+@pytest.mark.parametrize("how", ["replace", "truncate"])
+def test_replaced_log_is_parsed_again(log, tmp_path, how):
+    log.write_text(_lines(0, 4))
+    appmod._read_xml_events()
+
+    if how == "replace":
+        # a new inode, larger than the cached prefix
+        stop = 16
+        new = tmp_path / "new.jsonl"
+        new.write_text(_lines(10, stop))
+        os.replace(new, log)
+    else:
+        stop = 12
+        log.write_text(_lines(10, stop))
+    assert _names(appmod._read_xml_events()) == _newest_first(10, stop)
+
+
+def test_cold_limited_read_crosses_tail_blocks(log):
+    n = 2000
+    data = _lines(0, n)
+    # an unreadable line in the tail is skipped, not counted
+    cut = data.index("\n", len(data) - appmod._EVENTS_TAIL_BLOCK) + 1
+    log.write_text(data[:cut] + "{not json\n" + data[cut:])
+    assert log.stat().st_size > 2 * appmod._EVENTS_TAIL_BLOCK
+
+    limit = 1500
+    assert _names(appmod._read_xml_events(limit)) == _newest_first(n - limit, n)
+    # the partial read leaves the cache for the next full read
+    assert appmod._XML_EVENTS_CACHE == {}
+    assert _names(appmod._read_xml_events()) == _newest_first(0, n)
+
+
+def test_throughput_ignores_order_and_bad_timestamps():
+    today = datetime.date(2026, 1, 10)
+    events = [
+        {"tijdstip": "2026-01-10T09:00:00", "success": True},
+        {"tijdstip": "2025-12-01T09:00:00", "success": True},
+        {"tijdstip": "1-1-2026", "success": True},
+        {"tijdstip": 20260109, "success": True},
+        {"tijdstip": "", "success": True},
+        {"datum": "2026-01-09", "success": False},
+        {"tijdstip": "2026-01-08T09:00:00", "success": True},
+        {"tijdstip": "2026-01-10T08:00:00", "success": False},
+    ]
+    rows = appmod._aggregate_throughput(events, 3, today)
+    assert [(r["datum"], r["totaal"], r["geslaagd"]) for r in rows] == [
+        ("2026-01-08", 1, 1),
+        ("2026-01-09", 1, 0),
+        ("2026-01-10", 2, 1),
+    ]
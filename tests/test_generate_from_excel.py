@@ -0,0 +1,166 @@
+import importlib.util
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import openpyxl
+import pytest
+from lxml import etree
+
+ROOT = Path(__file__).parent.parent
+NS_BODY = "http://schemas.uwv.nl/UwvML/Berichten/UwvZwMeldingInternBody-v0428"
+
+
+@pytest.fixture(scope="module")
+def gen():
+    spec = importlib.util.spec_from_file_location(
+        "tools_generate_from_excel", str(ROOT / "tools" / "generate_from_excel.py")
+    )
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture
+def messages(gen):
+    records = [
+        {"BSN": "555501759", "Loonheffingennummer": "136910038L01"},
+        {"BSN": "555501760", "CdBerichtType": "VM"},
+    ]
+    return [gen.build_message_element(rec, NS_BODY)[0] for rec in records]
+
+
+@pytest.fixture
+def make_workbook(tmp_path):
+    """Factory: write `rows` under `headers` to an .xlsx in tmp_path."""
+
+    def make(headers, rows, name="sheet.xlsx"):
+        wb = openpyxl.Workbook()
+        wb.active.append(list(headers))
+        for row in rows:
+            wb.active.append(list(row))
+        path = tmp_path / name
+        wb.save(path)
+        return path
+
+    return make
+
+
+def test_envelope_writer_keeps_namespace_on_every_body(gen, tmp_path, messages):
+    path = gen.envelope_path(str(tmp_path), "bulk")
+    with gen.EnvelopeWriter(path) as writer:
+        for msg in messages:
+            writer.append(msg)
+    assert writer.count == 2
+
+    root = etree.parse(path).getroot()
+    bodies = root.find("{http://schemas.xmlsoap.org/soap/envelope/}Body")
+    assert [b.tag for b in bodies] == [f"{{{NS_BODY}}}UwvZwMeldingInternBody"] * 2
+    assert [b.findtext(f"{{{NS_BODY}}}CdBerichtType") for b in bodies] == [
+        "ZBM",
+        "VM",
+    ]
+
+
+def test_save_envelope_matches_streamed_layout(gen, tmp_path, messages):
+    env = gen.build_envelope_with_header_and_bodies(messages)
+    saved = gen.save_envelope(env, str(tmp_path), "bulk")
+
+    data = Path(saved).read_bytes()
+    assert data.startswith(b'<?xml version="1.0" encoding="UTF-8"?>\n')
+    assert b"<uwvh:UwvMLHeader xmlns:uwvh=" in data
+    assert data.count(f'<UwvZwMeldingInternBody xmlns="{NS_BODY}">'.encode()) == 2
+
+
+@pytest.mark.parametrize("sheet", ["docs", "built"])
+def test_row_view_matches_read_excel_rows(gen, make_workbook, sheet):
+    if sheet == "docs":
+        src = str(ROOT / "docs" / "Input XML electr ziekmeldinge.xlsx")
+    else:
+        src = str(make_workbook(["BSN", "Naam", "Leeg"], [[1, "a", None], [2, None]]))
+    headers, rows, formulas = gen.read_excel_table(src)
+    records, formulas_dict = gen.read_excel_rows(src)
+    assert formulas == formulas_dict
+
+    index = gen.header_index(headers)
+    for row, rec in zip(rows, records):
+        view = gen.RowView(index, row)
+        assert all(view.get(h) == rec.get(h) for h in rec)
+    assert gen.RowView(index, rows[0]).get("NietBestaand", "x") == "x"
+
+
+# One row touching every kind of `_BODY_LAYOUT` entry; the expected message in
+# tests/data was produced by the generator from before the per-layout builder
+FIXED_ROW = {
+    "CdBerichtType": " Digipoort ",
+    "Loonheffingennummer": "136910038L01",
+    "IndienerNaam": "Testbedrijf BV",
+    "BerichtkenmerkIndiener": "KENMERK-001",
+    "Kp_NaamContactpersoon": "P. de Vries",
+    "BSN": " 555501759 ",
+    "Geboortedatum": datetime(1980, 5, 17),
+    "Geslacht": "2",
+    "Voorletters": "J.",
+    "Voorvoegsel": "",
+    "Achternaam": "Jansen",
+    "Contact_EMailAdres": "hr@example.nl",
+    "DatTijdOpstellenMelding": "2025-11-25 09:30:00",
+    "DatEersteAoDag": 20251125,
+    "DatOntvangstMeldingWerkgever": "25-11-2025",
+    "IndWerkverplichtingEersteAoDag": "N",
+    "IndDirecteUitkering": "ja",
+    "CdRedenZiekmelding": "1",
+    "IndWerkdagOpZaterdag": "nee",
+    "AantGewerkteUrenEersteAoDag": 4,
+    "Bic": "RABONL2U",
+    "IBAN": "NL91ABNA0417164300",
+    "Personeelsnr": 1234,
+    "DatB": datetime(2020, 1, 1),
+    "ExtraKolom": "genegeerd",
+}
+
+
+def test_message_matches_expected_xml(gen):
+    expected = (ROOT / "tests" / "data" / "message_fixed_row.xml").read_bytes()
+    headers, row = tuple(FIXED_ROW), tuple(FIXED_ROW.values())
+
+    msg, aanvraag_type = gen.build_message_element(FIXED_ROW, NS_BODY)
+    assert aanvraag_type == "OTP3"
+    assert etree.tostring(msg, pretty_print=True) == expected
+
+    build = gen.message_builder(gen.header_index(headers), NS_BODY)
+    msg, aanvraag_type = build(row)
+    assert aanvraag_type == "OTP3"
+    assert etree.tostring(msg, pretty_print=True) == expected
+
+
+def test_single_mode_writes_every_row_with_the_same_bsn(
+    gen, tmp_path, monkeypatch, make_workbook
+):
+    # all rows share a BSN and are written within the same second on a pool of
+    # several threads; each must still end up in a complete file of its own
+    rows = 40
+    src = make_workbook(
+        ["BSN", "BerichtkenmerkIndiener"],
+        [[555501759, f"row-{i}"] for i in range(rows)],
+    )
+    out, log = tmp_path / "out", tmp_path / "gen.log"
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["generate_from_excel.py", "--mode", "single", "--input", str(src)]
+        + ["--outdir", str(out), "--log", str(log)],
+    )
+    gen.main()
+
+    files = list(out.iterdir())
+    assert len(files) == rows
+    assert all(f.suffix == ".xml" for f in files)
+    kenmerken = {
+        etree.parse(str(f)).findtext(f".//{{{NS_BODY}}}BerichtkenmerkIndiener")
+        for f in files
+    }
+    assert kenmerken == {f"row-{i}" for i in range(rows)}
+    assert "ERROR_SAVE" not in log.read_text()
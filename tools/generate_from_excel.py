@@ -9,20 +9,29 @@ Behavior (minimal):
 - Save each XML to `build/excel_generated/generated_<BSN>_<timestamp>.xml`.
 - Append a line to `build/logs/generator_excel.log` with status.
 
-This is intentionally minimal and uses only `openpyxl` for reading
-the Excel file and `xml.etree.ElementTree` for XML writing.
+This is intentionally minimal: `openpyxl` reads the Excel file and the
+XML is built and written with lxml when it is installed, falling back to
+`xml.etree.ElementTree` from the standard library otherwise.
 """
 
 from __future__ import annotations
 
 import argparse
+import contextlib
+import copy
+import functools
 import os
+import sys
+import tempfile
+import threading
 import uuid
+from collections import deque
 from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timezone
 
 try:
-    import xml.etree.ElementTree as ET
+    from lxml import etree as ET
 
     USING_LXML = True
 except ImportError:
@@ -38,8 +47,12 @@ except Exception:
     )
 
 
-def read_excel_rows(path: str, data_only: bool = False):
-    """Read all rows from the workbook and return a tuple (rows_list, formula_count).
+def read_excel_table(path: str, data_only: bool = False):
+    """Read the first worksheet column-wise: (headers, rows, formula_count).
+
+    `headers` is a tuple of header names and `rows` a list of value tuples in
+    the same column order, padded to the header width. No per-row dict is
+    built; wrap a row in `RowView` to look fields up by header name.
 
     If `data_only` is True, `openpyxl` will prefer cached values over formulas
     (useful if the workbook was saved with calculated values). Regardless, any
@@ -53,79 +66,224 @@ def read_excel_rows(path: str, data_only: bool = False):
         rows_iter = ws.iter_rows(values_only=True)
     else:
         raise ValueError("Worksheet is None")
-    headers = [h if h is not None else "" for h in next(rows_iter)]
+    headers = tuple(h if h is not None else "" for h in next(rows_iter))
+    n_headers = len(headers)
+    padding = (None,) * n_headers
     out_rows = []
     formula_count = 0
     for row in rows_iter:
-        rec = {}
-        for i in range(len(headers)):
-            raw = row[i] if i < len(row) else None
-            # sanitize formula-like strings to avoid embedding formulas in XML
-            if isinstance(raw, str) and raw.strip().startswith("="):
-                formula_count += 1
-                value = ""
-            else:
-                value = raw
-            rec[headers[i]] = value
-        out_rows.append(rec)
-    return out_rows, formula_count
+        # sanitize formula-like strings to avoid embedding formulas in XML;
+        # the exact-type check skips numbers/dates/None without a call, and
+        # lstrip() returns the same object when there is nothing to strip
+        sanitized = tuple(
+            "" if (raw.__class__ is str and raw.lstrip()[:1] == "=") else raw
+            for raw in row[:n_headers]
+        )
+        # only replaced formula cells are no longer the original object
+        formula_count += sum(1 for raw, val in zip(row, sanitized) if raw is not val)
+        if len(sanitized) < n_headers:
+            sanitized += padding[len(sanitized) :]
+        out_rows.append(sanitized)
+    return headers, out_rows, formula_count
 
 
+def read_excel_rows(path: str, data_only: bool = False):
+    """Read all rows from the workbook and return a tuple (rows_list, formula_count).
+
+    Same as `read_excel_table`, with every row turned into a header -> value
+    dict for callers that want to edit the records (e.g. the web upload).
+    """
+    headers, rows, formula_count = read_excel_table(path, data_only=data_only)
+    return [dict(zip(headers, row)) for row in rows], formula_count
+
+
+class RowView:
+    """Read-only `record.get` over one row tuple of `read_excel_table`.
+
+    `index` maps header name -> column (see `header_index`) and is shared by
+    all rows, so a view costs one small object instead of a dict per row.
+    """
+
+    __slots__ = ("index", "row")
+
+    def __init__(self, index: dict[str, int], row: tuple) -> None:
+        self.index = index
+        self.row = row
+
+    def get(self, name, default=None):
+        i = self.index.get(name)
+        return default if i is None else self.row[i]
+
+
+def header_index(headers: Iterable[str]) -> dict[str, int]:
+    # later duplicates win, like dict(zip(headers, row)) in read_excel_rows
+    return {h: i for i, h in enumerate(headers)}
+
+
+NS_SOAP = "http://schemas.xmlsoap.org/soap/envelope/"
+NS_UWVH = "http://schemas.uwv.nl/UwvML/Header-v0202"
+NS_BODY = "http://schemas.uwv.nl/UwvML/Berichten/UwvZwMeldingInternBody-v0428"
+
+# Clark-notation ("{ns}local") tags for the envelope structure, built once at
+# import instead of concatenated for every envelope/message
+_TAG_TABLE = (
+    (NS_SOAP, "Envelope"),
+    (NS_SOAP, "Header"),
+    (NS_SOAP, "Body"),
+    (NS_UWVH, "UwvMLHeader"),
+    (NS_BODY, "UwvZwMeldingInternBody"),
+)
+TAGS = {local: sys.intern(f"{{{ns}}}{local}") for ns, local in _TAG_TABLE}
+
+
+class _QNames(dict):
+    """Mapping local tag -> Clark-notation tag for one namespace.
+
+    Known tags are built up front; anything else is concatenated once on first
+    lookup and kept, so `qname(tag)` is a plain dict hit after warm-up.
+    """
+
+    __slots__ = ("ns",)
+
+    def __init__(self, ns: str, tags: Iterable[str] = ()) -> None:
+        super().__init__((t, sys.intern(f"{{{ns}}}{t}")) for t in tags)
+        self.ns = ns
+
+    def __missing__(self, tag: str) -> str:
+        q = self[tag] = f"{{{self.ns}}}{tag}"
+        return q
+
+
+# every child element build_message_element emits, in document order
+_BODY_TAGS = (
+    "CdBerichtType",
+    "IndAlleenControleUzs",
+    "Ketenpartij",
+    "FiscaalNr",
+    "Loonheffingennr",
+    "Naam",
+    "CdRolKetenpartij",
+    "CdSrtIndiener",
+    "NaamSoftwarePakket",
+    "VersieSoftwarePakket",
+    "BerichtkenmerkIndiener",
+    "VolgNr",
+    "Contactgegevens",
+    "NaamContactpersoonAfd",
+    "TelefoonnrContactpersoonAfd",
+    "NatuurlijkPersoon",
+    "Burgerservicenr",
+    "Geboortedat",
+    "IndOverlijden",
+    "Geslacht",
+    "EersteVoornaam",
+    "Voorletters",
+    "Voorvoegsel",
+    "SignificantDeelVanDeAchternaam",
+    "Telefoonnr",
+    "TelefoonnrMobiel",
+    "TelefoonnrBuitenland",
+    "NrLokaleVestiging",
+    "EMailAdres",
+    "MeldingZiekte",
+    "IndVerzoekTotIntrekken",
+    "ReferentieMelding",
+    "DatTijdOpstellenMelding",
+    "DatOntvangstMeldingWerkgever",
+    "DatEersteAoDag",
+    "ToelichtingMelding",
+    "IndWerkverplichtingEersteAoDag",
+    "IndDirecteUitkering",
+    "CdRedenAangifteAo",
+    "CdRedenZiekmelding",
+    "AantGewerkteUrenEersteAoDag",
+    "AantRoosterurenEersteAoDag",
+    "IndWerkdagOpZaterdag",
+    "IndWerkdagOpZondag",
+    "BedrSvLoonGedWerkenEersteAoDag",
+    "CdRedenRegres",
+    "OmsRedenTeLateAanvraagUitkering",
+    "GemiddeldAantWerkurenPerWeek",
+    "IndEDnstvrbndCtrTijdensZiekte",
+    "AdministratieveEenheid",
+    "Bankrekening",
+    "Bankrekeningnr",
+    "Bic",
+    "Iban",
+    "SectorRisicogroep",
+    "CdRisicopremiegroep",
+    "CdSectorOsv",
+    "Arbeidsverhouding",
+    "Volgnr",
+    "IndLoonheffingskorting",
+    "Personeelsnr",
+    "NaamBeroepOngecodeerd",
+    "CdAardArbv",
+    "CdLbtabel",
+    "DatB",
+    "AantLoonwachtdagen",
+    "PercLoondoorbetalingTijdensAo",
+    "IndArbeidsgehandicapt",
+)
+BODY_Q = _QNames(NS_BODY, _BODY_TAGS)
+
+
+# the prefixes only need registering once; every caller gets the same triple
+@functools.lru_cache(maxsize=1)
 def _namespaces():
-    NS_SOAP = "http://schemas.xmlsoap.org/soap/envelope/"
-    NS_UWVH = "http://schemas.uwv.nl/UwvML/Header-v0202"
-    NS_BODY = "http://schemas.uwv.nl/UwvML/Berichten/UwvZwMeldingInternBody-v0428"
     if not USING_LXML:
         ET.register_namespace("SOAP-ENV", NS_SOAP)
         ET.register_namespace("uwvh", NS_UWVH)
     return NS_SOAP, NS_UWVH, NS_BODY
 
 
-def build_envelope_with_header_and_bodies(
-    bodies: Iterable[ET.Element], sender: str = "Digipoort", tester_name: str = "tester"
-) -> ET.Element:
-    """Create a SOAP Envelope with header information and append provided message bodies.
+# Header fields that differ per envelope, in document order
+_HEADER_DYNAMIC = (
+    "DatTijdVersturenBericht",
+    "GegevensUitwisselingsnr",
+    "BerichtReferentienr",
+    "DatTijdAanmaakBericht",
+    "TransactieReferentienr",
+)
+_HEADER_TEMPLATES: dict[tuple[str, str], tuple[ET.Element, tuple[int, ...]]] = {}
+
 
-    Header fields mimic the sample: RouteInformatie, BerichtIdentificatie and Transactie.
+def _header_template(
+    sender: str, tester_name: str
+) -> tuple[ET.Element, tuple[int, ...]]:
+    """Return the static `uwvh:UwvMLHeader` subtree for this sender/tester.
+
+    The template is built once; the dynamic fields are left empty and their
+    positions in `iter()` order are returned so a copy can be patched directly.
     """
-    ns_soap, ns_uwvh, ns_body = _namespaces()
+    key = (sender, tester_name)
+    cached = _HEADER_TEMPLATES.get(key)
+    if cached is not None:
+        return cached
+
+    _namespaces()  # registers the prefixes for the ElementTree fallback
 
     if USING_LXML:
-        # With lxml, declare ALL namespaces at the Envelope level with desired prefixes
-        # This prevents lxml from auto-generating ns0, ns1, ns2 prefixes
-        NSMAP_ENV = {
-            "SOAP-ENV": ns_soap,
-            "uwvh": ns_uwvh,
-            None: ns_body,  # default namespace for body elements
-        }
-        env = ET.Element("{" + ns_soap + "}Envelope", nsmap=NSMAP_ENV)  # type: ignore[call-arg]
-        header = ET.SubElement(env, "{" + ns_soap + "}Header")
-        uwvh = ET.SubElement(header, "{" + ns_uwvh + "}UwvMLHeader")
+        # Declare the uwvh prefix on the header itself (matches the sample layout)
+        uwvh = ET.Element(
+            TAGS["UwvMLHeader"], nsmap={"uwvh": NS_UWVH}
+        )  # type: ignore[call-arg]
     else:
-        # ElementTree fallback
-        env = ET.Element("{" + ns_soap + "}Envelope")
-        header = ET.SubElement(env, "{" + ns_soap + "}Header")
-        uwvh = ET.SubElement(header, "{" + ns_uwvh + "}UwvMLHeader")
+        uwvh = ET.Element(TAGS["UwvMLHeader"])
 
     # RouteInformatie
     route = ET.SubElement(uwvh, "RouteInformatie")
     bron = ET.SubElement(route, "Bron")
     ET.SubElement(bron, "ApplicatieNaam").text = sender
-    ET.SubElement(bron, "DatTijdVersturenBericht").text = (
-        datetime.now(timezone.utc).astimezone().isoformat()
-    )
+    ET.SubElement(bron, "DatTijdVersturenBericht")
     dst = ET.SubElement(route, "Bestemming")
     ET.SubElement(dst, "ApplicatieNaam").text = "UZS"
-    ET.SubElement(route, "GegevensUitwisselingsnr").text = (
-        f"GegUitNr-{uuid.uuid4().hex[:8]}"
-    )
+    ET.SubElement(route, "GegevensUitwisselingsnr")
     ET.SubElement(route, "RefnrGegevensUitwisselingsExtern").text = "NOCOREFLEX"
 
-    # BerichtIdentificatie - use tester name + timestamp (max 50 chars)
+    # BerichtIdentificatie
     bi = ET.SubElement(uwvh, "BerichtIdentificatie")
-    ts = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-    safe_name = tester_name.replace(" ", "")[:30]  # sanitize and limit name
-    ET.SubElement(bi, "BerichtReferentienr").text = f"{safe_name}_{ts}"[:50]
+    ET.SubElement(bi, "BerichtReferentienr")
     bt = ET.SubElement(bi, "BerichtType")
     ET.SubElement(bt, "BerichtNaam").text = "UwvZwMeldingInternBody"
     ET.SubElement(bt, "VersieMajor").text = "04"
@@ -133,89 +291,323 @@ def build_envelope_with_header_and_bodies(
     ET.SubElement(bt, "Buildnr").text = "01"
     ET.SubElement(bt, "CommunicatieType").text = "Melding"
     ET.SubElement(bt, "CommunicatieElement").text = "Melding"
-    ET.SubElement(bi, "DatTijdAanmaakBericht").text = (
-        datetime.now(timezone.utc).astimezone().isoformat()
-    )
+    ET.SubElement(bi, "DatTijdAanmaakBericht")
     ET.SubElement(bi, "IndTestbericht").text = "2"
 
     # Transactie
     tr = ET.SubElement(uwvh, "Transactie")
-    ET.SubElement(tr, "TransactieReferentienr").text = f"TraRef-{uuid.uuid4().hex[:8]}"
+    ET.SubElement(tr, "TransactieReferentienr")
     ET.SubElement(tr, "Volgordenr").text = "1"
     ET.SubElement(tr, "IndLaatsteBericht").text = "1"
 
-    body = ET.SubElement(env, "{" + ns_soap + "}Body")
+    positions = tuple(
+        i for i, el in enumerate(uwvh.iter()) if el.tag in _HEADER_DYNAMIC
+    )
+    cached = _HEADER_TEMPLATES[key] = (uwvh, positions)
+    return cached
+
+
+def _build_uwvml_header(
+    sender: str = "Digipoort", tester_name: str = "tester"
+) -> ET.Element:
+    """Create the `uwvh:UwvMLHeader` element that goes inside `SOAP-ENV:Header`.
+
+    Header fields mimic the sample: RouteInformatie, BerichtIdentificatie and
+    Transactie. Only the timestamps and reference numbers are filled in per
+    call; the rest is copied from a cached template.
+    """
+    template, positions = _header_template(sender, tester_name)
+    uwvh = copy.deepcopy(template)
+    nodes = list(uwvh.iter())
+    sent, geg_uit_nr, ber_ref, created, tra_ref = (nodes[i] for i in positions)
+
+    # one clock read per header: sent and created carry the same instant
+    now = datetime.now(timezone.utc)
+    now_iso = now.astimezone().isoformat()
+    sent.text = now_iso
+    geg_uit_nr.text = f"GegUitNr-{uuid.uuid4().hex[:8]}"
+    # BerichtReferentienr - use tester name + UTC timestamp (max 50 chars)
+    ts = now.strftime("%Y%m%d%H%M%S")
+    safe_name = tester_name.replace(" ", "")[:30]  # sanitize and limit name
+    ber_ref.text = f"{safe_name}_{ts}"[:50]
+    created.text = now_iso
+    tra_ref.text = f"TraRef-{uuid.uuid4().hex[:8]}"
+
+    return uwvh
+
+
+def build_envelope_with_header_and_bodies(
+    bodies: Iterable[ET.Element], sender: str = "Digipoort", tester_name: str = "tester"
+) -> ET.Element:
+    """Create a SOAP Envelope with header information and append the message bodies.
+
+    Header fields mimic the sample: RouteInformatie, BerichtIdentificatie and
+    Transactie.
+    """
+    _namespaces()  # registers the prefixes for the ElementTree fallback
+
+    if USING_LXML:
+        # Only SOAP-ENV is declared on the Envelope; the header declares `uwvh`
+        # and every message body carries its own default namespace, so lxml
+        # never has to invent ns0/ns1 prefixes.
+        env = ET.Element(
+            TAGS["Envelope"], nsmap={"SOAP-ENV": NS_SOAP}
+        )  # type: ignore[call-arg]
+    else:
+        # ElementTree fallback
+        env = ET.Element(TAGS["Envelope"])
+    header = ET.SubElement(env, TAGS["Header"])
+    header.append(_build_uwvml_header(sender, tester_name))
+
+    body = ET.SubElement(env, TAGS["Body"])
     for b in bodies:
         body.append(b)
 
     return env
 
 
-def save_envelope(
-    envelope: ET.Element, out_dir: str, basename_hint: str, aanvraag_type: str = "ZBM"
-) -> str:
-    os.makedirs(out_dir, exist_ok=True)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8"?>\n'
 
-    # Map CdBerichtType codes to friendly names for filename
-    type_mapping = {"OTP3": "digipoort", "ZBM": "zbm", "VM": "vm"}
-    friendly_type = type_mapping.get(aanvraag_type, aanvraag_type.lower())
 
-    filename = f"{friendly_type}_{basename_hint}_{ts}.xml"
-    path = os.path.join(out_dir, filename)
+class EnvelopeWriter:
+    """Stream a SOAP Envelope to `path` one message body at a time.
 
-    if USING_LXML:
-        # Serialize with pretty print
-        xml_bytes = ET.tostring(envelope, pretty_print=True, xml_declaration=False, encoding="UTF-8")  # type: ignore[call-arg]
-        xml_str = xml_bytes.decode("UTF-8")
-
-        # Move xmlns:uwvh from Envelope to UwvMLHeader (user preference for example alignment)
-        # Remove it from Envelope tag (first occurrence only)
-        xml_str = xml_str.replace(
-            ' xmlns:uwvh="http://schemas.uwv.nl/UwvML/Header-v0202"', "", 1
-        )
-        # Add it to UwvMLHeader tag (first occurrence only)
-        xml_str = xml_str.replace(
-            "<uwvh:UwvMLHeader>",
-            '<uwvh:UwvMLHeader xmlns:uwvh="http://schemas.uwv.nl/UwvML/Header-v0202">',
-            1,
-        )
+    The XML counterpart of openpyxl's write-only worksheet: the header is
+    written on enter, every appended body is serialized straight into the
+    file and the Envelope is closed on exit, so memory stays at one message
+    regardless of the number of rows. lxml's `xmlfile` does the incremental
+    writing; without lxml the Envelope/Body tags are written by hand around
+    each separately serialized element. The document is written to a temp
+    file of its own next to `path` and only moved to `path` when the Envelope
+    is complete.
 
-        # Also move default namespace from Envelope to Body element (if present)
-        xml_str = xml_str.replace(
-            ' xmlns="http://schemas.uwv.nl/UwvML/Berichten/UwvZwMeldingInternBody-v0428"',
-            "",
-            1,
-        )
-        # Find the UwvZwMeldingInternBody opening tag and add xmlns there
-        # This regex handles possible existing attributes or whitespace
-        import re
-
-        xml_str = re.sub(
-            r"<UwvZwMeldingInternBody",
-            '<UwvZwMeldingInternBody xmlns="http://schemas.uwv.nl/UwvML/Berichten/UwvZwMeldingInternBody-v0428"',
-            xml_str,
-            count=1,
-        )
+        with EnvelopeWriter(path) as writer:
+            for rec in rows:
+                writer.append(build_message_element(rec, ns_body)[0])
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sender: str = "Digipoort",
+        tester_name: str = "tester",
+        pretty: bool = False,
+    ) -> None:
+        self.path = path
+        self.sender = sender
+        self.tester_name = tester_name
+        self.pretty = pretty
+        self.count = 0
+        self._stack: contextlib.ExitStack | None = None
+        self._xf = None
+        self._fh = None
+        self._tmp: str | None = None
+
+    def __enter__(self) -> EnvelopeWriter:
+        nl = "\n" if self.pretty else ""
+        header = _build_uwvml_header(self.sender, self.tester_name)
+        fd, tmp = _create_temp(self.path)
+        try:
+            self._enter(os.fdopen(fd, "wb"), header, nl)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+            raise
+        self._tmp = tmp
+        return self
+
+    def _enter(self, fh, header: ET.Element, nl: str) -> None:
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(fh)
+            fh.write(XML_DECLARATION)
+            if USING_LXML:
+                xf = stack.enter_context(ET.xmlfile(fh, encoding="UTF-8"))
+                stack.enter_context(
+                    xf.element(TAGS["Envelope"], nsmap={"SOAP-ENV": NS_SOAP})
+                )
+                xf.write(nl)
+                with xf.element(TAGS["Header"]):
+                    xf.write(header, pretty_print=self.pretty)
+                xf.write(nl)
+                stack.enter_context(xf.element(TAGS["Body"]))
+                xf.write(nl)
+                self._xf = xf
+            else:
+                if self.pretty:
+                    ET.indent(header)
+                fh.write(
+                    f'<SOAP-ENV:Envelope xmlns:SOAP-ENV="{NS_SOAP}">{nl}'
+                    "<SOAP-ENV:Header>".encode()
+                )
+                fh.write(ET.tostring(header, encoding="utf-8"))
+                fh.write(f"{nl}</SOAP-ENV:Header>{nl}<SOAP-ENV:Body>{nl}".encode())
+                self._fh = fh
+            self._stack = stack.pop_all()
+
+    def append(self, msg: ET.Element) -> None:
+        if self._xf is not None:
+            self._xf.write(msg, pretty_print=self.pretty)
+        else:
+            if self.pretty:
+                ET.indent(msg)
+            # serialize the body with its own namespace as the default one,
+            # the way lxml writes it (no ns0: prefixes)
+            ns = msg.tag[1:].partition("}")[0]
+            self._fh.write(ET.tostring(msg, encoding="utf-8", default_namespace=ns))
+            if self.pretty:
+                self._fh.write(b"\n")
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if self._stack is None:
+            return False
+        tmp = self._tmp
+        try:
+            if self._fh is not None and exc_type is None:
+                self._fh.write(b"</SOAP-ENV:Body></SOAP-ENV:Envelope>")
+            self._stack.__exit__(exc_type, exc, tb)
+        finally:
+            self._stack = None
+            self._xf = None
+            self._fh = None
+            self._tmp = None
+        if exc_type is None:
+            os.replace(tmp, self.path)
+        else:
+            # never leave a truncated document behind
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
+        return False
+
+
+# Map CdBerichtType codes to friendly names for filename
+_FRIENDLY_TYPES = {"OTP3": "digipoort", "ZBM": "zbm", "VM": "vm"}
+
+
+# Names handed out during the current second: stem -> count. Rows with the same
+# BSN in the same second would otherwise share (and overwrite) one file.
+_PATH_LOCK = threading.Lock()
+_PATH_SEQ: dict[str, int] = {}
+_PATH_SEQ_TS = ""
+
+
+def envelope_path(out_dir: str, basename_hint: str, aanvraag_type: str = "ZBM") -> str:
+    """Return a new output path for an envelope in `out_dir`.
+
+    The name carries the second it was made in; a repeat of the same name within
+    that second gets a `_2`, `_3`, ... suffix, so every call in this process
+    returns a different path. The directory is not touched here; the writers
+    create it when the first file in it is opened (see `_create_temp`).
+    """
+    global _PATH_SEQ_TS
+    friendly_type = _FRIENDLY_TYPES.get(aanvraag_type) or aanvraag_type.lower()
+    with _PATH_LOCK:
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if ts != _PATH_SEQ_TS:
+            _PATH_SEQ.clear()
+            _PATH_SEQ_TS = ts
+        stem = os.path.join(out_dir, f"{friendly_type}_{basename_hint}_{ts}")
+        n = _PATH_SEQ[stem] = _PATH_SEQ.get(stem, 0) + 1
+    return f"{stem}.xml" if n == 1 else f"{stem}_{n}.xml"
+
+
+def save_envelope(
+    envelope: ET.Element,
+    out_dir: str,
+    basename_hint: str,
+    aanvraag_type: str = "ZBM",
+    pretty: bool = False,
+) -> str:
+    """Serialize `envelope` to a new file in `out_dir` and return its path.
+
+    Output is compact unless `pretty` is set; the receiving side ignores the
+    whitespace, so indenting is only useful when a person reads the file.
+    """
+    path = envelope_path(out_dir, basename_hint, aanvraag_type)
 
-        with open(path, "wb") as f:
-            f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
-            f.write(xml_str.encode("UTF-8"))
+    if USING_LXML:
+        # namespace declarations already sit on the UwvMLHeader and each
+        # UwvZwMeldingInternBody (see builders above)
+        data = XML_DECLARATION + ET.tostring(
+            envelope, pretty_print=pretty, xml_declaration=False, encoding="UTF-8"
+        )  # type: ignore[call-arg]
     else:
         # ElementTree fallback
-        try:
-            ET.indent(envelope)  # pretty print (Python 3.9+)
-        except Exception:
-            pass
-        tree = ET.ElementTree(envelope)
-        tree.write(path, encoding="utf-8", xml_declaration=True)
+        if pretty:
+            try:
+                ET.indent(envelope)  # pretty print (Python 3.9+)
+            except Exception:
+                pass
+        data = ET.tostring(envelope, encoding="utf-8", xml_declaration=True)
 
+    _write_bytes(path, data)
     return path
 
 
+def _write_bytes(path: str, data: bytes) -> None:
+    """Write a fully serialized document with a single write() where possible.
+
+    `tree.write` and buffered file objects flush in small chunks; writing the
+    complete bytes object keeps it to one syscall per file in single mode.
+    The data goes to a temp file first and is moved into place with
+    `os.replace`, so readers of the output folder never see a partial file.
+    """
+    fd, tmp = _create_temp(path)
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+
+
+# process umask, read once: os.umask can only be queried by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _create_temp(path: str) -> tuple[int, str]:
+    """Create a uniquely named temp file next to `path`; return (fd, temp path).
+
+    Every writer gets a file of its own, so concurrent writers of one `path`
+    cannot truncate or move each other's data. Missing parent directories are
+    created on the first failure only.
+    """
+    directory = os.path.dirname(path) or "."
+    prefix = os.path.basename(path) + "."
+    try:
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", prefix=prefix, dir=directory)
+    except FileNotFoundError:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", prefix=prefix, dir=directory)
+    # mkstemp creates the file private (0600); give it the mode open() would
+    if hasattr(os, "fchmod"):
+        os.fchmod(fd, 0o666 & ~_UMASK)
+    return fd, tmp
+
+
+def _open_creating_dirs(path: str, mode: str, **kwargs):
+    """`open()` that creates missing parent directories on the first failure.
+
+    Output and log folders almost always exist, so this skips the makedirs
+    stat on every file and only pays for it when the open actually fails.
+    """
+    try:
+        return open(path, mode, **kwargs)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return open(path, mode, **kwargs)
+
+
 def append_log(log_path: str, entry: str) -> None:
-    os.makedirs(os.path.dirname(log_path), exist_ok=True)
-    with open(log_path, "a", encoding="utf-8") as fh:
+    with _open_creating_dirs(log_path, "a", encoding="utf-8") as fh:
         fh.write(entry + "\n")
 
 
@@ -253,371 +645,391 @@ def _map_cd_reden_ziekmelding(code: str) -> str:
     return code
 
 
-def build_message_element(
-    record: dict[str, str], ns_body: str
-) -> tuple[ET.Element, str]:
-    """Create a `UwvZwMeldingInternBody` element (without Envelope/Body wrapper).
+# Excel columns that can carry the CdBerichtType, in order of preference
+_CD_NAMES = ("CdBerichtType", "aanvraag_type", "Type")
 
-    Returns tuple of (element, aanvraag_type) for use in filename generation.
-
-    This function is intentionally minimal and maps Excel columns to
-    the child elements used in the sample XML.
-    """
-    # Create element with namespace in tag name to prevent parsers from adding prefixes
-    # The default namespace will be declared at the Envelope level with nsmap
-    msg = ET.Element("{" + ns_body + "}UwvZwMeldingInternBody")
-
-    def qname(tag: str) -> str:
-        # Always include namespace in tag to prevent auto-generated prefixes
-        # When elements have explicit namespace and default xmlns is declared,
-        # serialization will not show prefixes
-        return "{" + ns_body + "}" + tag
-
-    def set_if(parent, tag, value):
-        if value is None:
-            return
-        s = str(value).strip()
-        if s == "":
-            return
-        ET.SubElement(parent, qname(tag)).text = s
 
-    def set_date_if(parent, tag, value, date_only=True):
-        if value is None:
-            return
-        # normalize common date/datetime representations to ISO
-        try:
-            if isinstance(value, datetime):
-                if date_only:
-                    out = value.strftime("%Y%m%d")
-                else:
-                    out = value.strftime("%Y%m%d%H%M%S")
-                ET.SubElement(parent, qname(tag)).text = out
-                return
-            s = str(value).strip()
-            if s == "":
-                return
-            # if value is compact numeric YYYYMMDD, keep as-is for date-only
-            if len(s) == 8 and s.isdigit():
-                if date_only:
-                    out = s  # keep YYYYMMDD format
-                else:
-                    out = f"{s}000000" if len(s) == 8 else s
-                ET.SubElement(parent, qname(tag)).text = out
-                return
-            # try ISO parse
-            try:
-                dt = datetime.fromisoformat(s)
-                if date_only:
-                    out = dt.strftime("%Y%m%d")
-                else:
-                    out = dt.strftime("%Y%m%d%H%M%S")
-                ET.SubElement(parent, qname(tag)).text = out
-                return
-            except Exception:
-                # fallback: do not write if unclear
-                return
-        except Exception:
-            return
+@functools.lru_cache(maxsize=4096)
+def _format_date_text(value: str, date_only: bool) -> str | None:
+    """Normalize a textual date cell to YYYYMMDD (or YYYYMMDDhhmmss).
 
-    # CdBerichtType: REQUIRED by XSD. Must be one of the enumerated values.
-    # Only use OTP3 for Digipoort messages; for ZBM, VM, etc., use their actual code.
-    # Default to ZBM if not specified (most common use case).
-    aanvraag_type = "ZBM"  # Initialize default
+    Date columns repeat a handful of values across rows, so each distinct
+    text is parsed only once. Returns None when the value is empty or not a
+    recognisable date.
+    """
+    s = value.strip()
+    if s == "":
+        return None
+    # if value is compact numeric YYYYMMDD, keep as-is for date-only
+    if len(s) == 8 and s.isdigit():
+        return s if date_only else f"{s}000000"
+    # try ISO parse
     try:
-        excel_cd_names = ["CdBerichtType", "aanvraag_type", "Type"]
-        excel_cd = None
-        for n in excel_cd_names:
-            v = record.get(n)
-            if v is not None and str(v).strip() != "":
-                excel_cd = str(v).strip()
-                break
-
-        if excel_cd:
-            # Map Digipoort to OTP3; for ZBM, VM, etc., use as-is
-            if excel_cd.upper() == "DIGIPOORT":
-                cd_val = "OTP3"
-            else:
-                cd_val = excel_cd  # ZBM stays ZBM, VM stays VM
-        else:
-            cd_val = "ZBM"  # Default to ZBM if not specified (required by XSD)
-
-        ET.SubElement(msg, qname("CdBerichtType")).text = cd_val
-        aanvraag_type = cd_val  # Store for return
-    except Exception:
-        # Fallback: always provide a value since it's required
-        ET.SubElement(msg, qname("CdBerichtType")).text = "ZBM"
-        aanvraag_type = "ZBM"
-    ET.SubElement(msg, qname("IndAlleenControleUzs")).text = record.get(
-        "IndAlleenControleUzs", "2"
-    )
-
+        dt = datetime.fromisoformat(s)
+    except ValueError:
+        return None
+    return dt.strftime("%Y%m%d" if date_only else "%Y%m%d%H%M%S")
+
+
+# Declarative mapping of Excel columns to the UwvZwMeldingInternBody children,
+# in document order. Each entry is (op, parent, tag, columns, arg):
+#   "group"    container element, always written; arg = variable name
+#   "group_if" container written only when one of `columns` has a value
+#   "text"     stripped text of the first of `columns` present in the sheet,
+#              skipped when empty unless arg gives a default
+#   "date"     date/datetime normalised by _format_date_text; arg = date_only
+#   "ind_jn"   J/N style indicator normalised to 1/2
+#   "cd_reden" CdRedenZiekmelding code
+#   "lhn"      loonheffingennummer -> FiscaalNr + Loonheffingennr
+#   "cd_type"  CdBerichtType from the first non-blank column (Digipoort ->
+#              OTP3); arg = default. Also the aanvraag_type that is returned.
+_BODY_LAYOUT = (
+    # CdBerichtType: REQUIRED by XSD. Must be one of the enumerated values.
+    ("cd_type", "msg", "CdBerichtType", _CD_NAMES, "ZBM"),
+    ("text", "msg", "IndAlleenControleUzs", ("IndAlleenControleUzs",), "2"),
     # Ketenpartij
-    kp = ET.SubElement(msg, qname("Ketenpartij"))
-    lhn = (
-        record.get("Loonheffingennummer")
-        or record.get("Loonheffingennr")
-        or record.get("Loonheffingennr")
-    )
-    if lhn:
-        set_if(kp, "FiscaalNr", str(lhn)[:9])
-        set_if(kp, "Loonheffingennr", str(lhn))
-    set_if(kp, "Naam", record.get("IndienerNaam", None))
-    ET.SubElement(kp, qname("CdRolKetenpartij")).text = record.get(
-        "CdRolKetenpartij", "01"
-    )
-    ET.SubElement(kp, qname("CdSrtIndiener")).text = record.get("CdSrtIndiener", "WG")
-    ET.SubElement(kp, qname("NaamSoftwarePakket")).text = record.get(
-        "NaamSoftwarePakket", "Generated"
-    )
-    ET.SubElement(kp, qname("VersieSoftwarePakket")).text = record.get(
-        "VersieSoftwarePakket", "1.0"
-    )
-    ET.SubElement(kp, qname("BerichtkenmerkIndiener")).text = record.get(
-        "BerichtkenmerkIndiener", ""
-    )
-    ET.SubElement(kp, qname("VolgNr")).text = record.get("VolgNr", "1")
-    kp_c = ET.SubElement(kp, qname("Contactgegevens"))
-    ET.SubElement(kp_c, qname("NaamContactpersoonAfd")).text = record.get(
-        "Kp_NaamContactpersoon", ""
-    )
-    ET.SubElement(kp_c, qname("TelefoonnrContactpersoonAfd")).text = record.get(
-        "Kp_TelefoonnrContactpersoonAfd", ""
-    )
-
+    ("group", "msg", "Ketenpartij", (), "kp"),
+    ("lhn", "kp", None, ("Loonheffingennummer", "Loonheffingennr"), None),
+    ("text", "kp", "Naam", ("IndienerNaam",), None),
+    ("text", "kp", "CdRolKetenpartij", ("CdRolKetenpartij",), "01"),
+    ("text", "kp", "CdSrtIndiener", ("CdSrtIndiener",), "WG"),
+    ("text", "kp", "NaamSoftwarePakket", ("NaamSoftwarePakket",), "Generated"),
+    ("text", "kp", "VersieSoftwarePakket", ("VersieSoftwarePakket",), "1.0"),
+    ("text", "kp", "BerichtkenmerkIndiener", ("BerichtkenmerkIndiener",), None),
+    ("text", "kp", "VolgNr", ("VolgNr",), "1"),
+    (
+        "group_if",
+        "kp",
+        "Contactgegevens",
+        ("Kp_NaamContactpersoon", "Kp_TelefoonnrContactpersoonAfd"),
+        "kp_c",
+    ),
+    ("text", "kp_c", "NaamContactpersoonAfd", ("Kp_NaamContactpersoon",), None),
+    (
+        "text",
+        "kp_c",
+        "TelefoonnrContactpersoonAfd",
+        ("Kp_TelefoonnrContactpersoonAfd",),
+        None,
+    ),
     # NatuurlijkPersoon
-    np = ET.SubElement(msg, qname("NatuurlijkPersoon"))
-    bsn = record.get("BSN")
-    if bsn is not None:
-        set_if(np, "Burgerservicenr", bsn)
-    geb = record.get("Geboortedatum")
-    set_date_if(np, "Geboortedat", geb, date_only=True)
-    # optional flags
-    set_if(np, "IndOverlijden", record.get("IndOverlijden", None))
-    set_if(np, "Geslacht", record.get("Geslacht", None))
-    set_if(np, "EersteVoornaam", record.get("EersteVoornaam", None))
-    set_if(np, "Voorletters", record.get("Voorletters", None))
-    set_if(np, "Voorvoegsel", record.get("Voorvoegsel", None))
-    ach = record.get("Achternaam")
-    if ach is not None:
-        set_if(np, "SignificantDeelVanDeAchternaam", ach)
-    set_if(np, "Telefoonnr", record.get("Telefoonnr", None))
-    set_if(np, "TelefoonnrMobiel", record.get("TelefoonnrMobiel", None))
-    set_if(np, "TelefoonnrBuitenland", record.get("TelefoonnrBuitenland", None))
-
+    ("group", "msg", "NatuurlijkPersoon", (), "np"),
+    ("text", "np", "Burgerservicenr", ("BSN",), None),
+    ("date", "np", "Geboortedat", ("Geboortedatum",), True),
+    ("text", "np", "IndOverlijden", ("IndOverlijden",), None),
+    ("text", "np", "Geslacht", ("Geslacht",), None),
+    ("text", "np", "EersteVoornaam", ("EersteVoornaam",), None),
+    ("text", "np", "Voorletters", ("Voorletters",), None),
+    ("text", "np", "Voorvoegsel", ("Voorvoegsel",), None),
+    ("text", "np", "SignificantDeelVanDeAchternaam", ("Achternaam",), None),
+    ("text", "np", "Telefoonnr", ("Telefoonnr",), None),
+    ("text", "np", "TelefoonnrMobiel", ("TelefoonnrMobiel",), None),
+    ("text", "np", "TelefoonnrBuitenland", ("TelefoonnrBuitenland",), None),
     # Contactgegevens (top-level)
-    contact = ET.SubElement(msg, qname("Contactgegevens"))
-    set_if(
-        contact,
+    ("group", "msg", "Contactgegevens", (), "contact"),
+    (
+        "text",
+        "contact",
         "NaamContactpersoonAfd",
-        record.get("Contact_NaamContactpersoonAfd", None),
-    )
-    set_if(contact, "Geslacht", record.get("Contact_Geslacht", None))
-    set_if(
-        contact,
+        ("Contact_NaamContactpersoonAfd",),
+        None,
+    ),
+    ("text", "contact", "Geslacht", ("Contact_Geslacht",), None),
+    (
+        "text",
+        "contact",
         "TelefoonnrContactpersoonAfd",
-        record.get("Contact_TelefoonnrContactpersoonAfd", None),
-    )
-    set_if(contact, "NrLokaleVestiging", record.get("Contact_NrLokaleVestiging", None))
-    set_if(contact, "EMailAdres", record.get("Contact_EMailAdres", None))
-
+        ("Contact_TelefoonnrContactpersoonAfd",),
+        None,
+    ),
+    ("text", "contact", "NrLokaleVestiging", ("Contact_NrLokaleVestiging",), None),
+    ("text", "contact", "EMailAdres", ("Contact_EMailAdres",), None),
     # MeldingZiekte
-    mz = ET.SubElement(msg, qname("MeldingZiekte"))
-    set_if(mz, "IndVerzoekTotIntrekken", record.get("IndVerzoekTotIntrekken", None))
-    set_if(mz, "ReferentieMelding", record.get("ReferentieMelding", None))
+    ("group", "msg", "MeldingZiekte", (), "mz"),
+    ("text", "mz", "IndVerzoekTotIntrekken", ("IndVerzoekTotIntrekken",), None),
+    ("text", "mz", "ReferentieMelding", ("ReferentieMelding",), None),
     # DatTijdOpstellenMelding expects a datetime-like value
-    set_date_if(
-        mz,
-        "DatTijdOpstellenMelding",
-        record.get("DatTijdOpstellenMelding", None),
-        date_only=False,
-    )
-    set_date_if(
-        mz,
-        "DatOntvangstMeldingWerkgever",
-        record.get("DatOntvangstMeldingWerkgever", None),
-        date_only=True,
-    )
-    d1 = record.get("DatEersteAoDag")
-    set_date_if(mz, "DatEersteAoDag", d1, date_only=True)
-    set_if(mz, "ToelichtingMelding", record.get("ToelichtingMelding", None))
-    # Normalize IndJN fields to 1/2 format
-    ind_werk = record.get("IndWerkverplichtingEersteAoDag", None)
-    if ind_werk:
-        set_if(mz, "IndWerkverplichtingEersteAoDag", _normalize_ind_jn(ind_werk))
-    ind_direct = record.get("IndDirecteUitkering", None)
-    if ind_direct:
-        set_if(mz, "IndDirecteUitkering", _normalize_ind_jn(ind_direct))
-    set_if(mz, "CdRedenAangifteAo", record.get("CdRedenAangifteAo", None))
-    # Map CdRedenZiekmelding if present
-    cd_reden = record.get("CdRedenZiekmelding", None)
-    if cd_reden:
-        set_if(
-            mz, "CdRedenZiekmelding", _map_cd_reden_ziekmelding(str(cd_reden).strip())
-        )
-    set_if(
-        mz,
-        "AantGewerkteUrenEersteAoDag",
-        record.get("AantGewerkteUrenEersteAoDag", None),
-    )
-    set_if(
-        mz, "AantRoosterurenEersteAoDag", record.get("AantRoosterurenEersteAoDag", None)
-    )
-    ind_zat = record.get("IndWerkdagOpZaterdag", None)
-    if ind_zat:
-        set_if(mz, "IndWerkdagOpZaterdag", _normalize_ind_jn(ind_zat))
-    ind_zon = record.get("IndWerkdagOpZondag", None)
-    if ind_zon:
-        set_if(mz, "IndWerkdagOpZondag", _normalize_ind_jn(ind_zon))
-    set_if(
-        mz,
-        "BedrSvLoonGedWerkenEersteAoDag",
-        record.get("BedrSvLoonGedWerkenEersteAoDag", None),
-    )
-    set_if(mz, "CdRedenRegres", record.get("CdRedenRegres", None))
-    set_if(
-        mz,
-        "OmsRedenTeLateAanvraagUitkering",
-        record.get("OmsRedenTeLateAanvraagUitkering", None),
-    )
-    set_if(
-        mz,
-        "GemiddeldAantWerkurenPerWeek",
-        record.get("GemiddeldAantWerkurenPerWeek", None),
-    )
-    set_if(
-        mz,
-        "IndEDnstvrbndCtrTijdensZiekte",
-        record.get("IndEDnstvrbndCtrTijdensZiekte", None),
-    )
-
-    # AdministratieveEenheid
-    ae = ET.SubElement(msg, qname("AdministratieveEenheid"))
-    set_if(ae, "Loonheffingennr", record.get("Loonheffingennummer", None))
-    set_if(ae, "Naam", record.get("AE_Naam", None))
-    bank = ET.SubElement(ae, qname("Bankrekening"))
-    set_if(bank, "Bankrekeningnr", record.get("Bankrekeningnr", None))
-    set_if(bank, "Bic", record.get("BIC", record.get("Bic", None)))
-    set_if(bank, "Iban", record.get("Rekeningnummer (IBAN)", record.get("IBAN", None)))
-    sr = ET.SubElement(ae, qname("SectorRisicogroep"))
-    set_if(sr, "CdRisicopremiegroep", record.get("CdRisicopremiegroep", None))
-    set_if(sr, "CdSectorOsv", record.get("CdSectorOsv", None))
-    arb = ET.SubElement(ae, qname("Arbeidsverhouding"))
-    set_if(arb, "Volgnr", record.get("Volgnr", None))
-    set_if(arb, "IndLoonheffingskorting", record.get("IndLoonheffingskorting", None))
-    set_if(arb, "Personeelsnr", record.get("Personeelsnr", None))
-    set_if(arb, "NaamBeroepOngecodeerd", record.get("NaamBeroepOngecodeerd", None))
-    set_if(arb, "CdAardArbv", record.get("CdAardArbv", None))
-    set_if(arb, "CdLbtabel", record.get("CdLbtabel", None))
-    set_date_if(arb, "DatB", record.get("DatB", None), date_only=True)
-    set_if(arb, "AantLoonwachtdagen", record.get("AantLoonwachtdagen", None))
-    set_if(
-        arb,
-        "PercLoondoorbetalingTijdensAo",
-        record.get("PercLoondoorbetalingTijdensAo", None),
-    )
-    set_if(arb, "IndArbeidsgehandicapt", record.get("IndArbeidsgehandicapt", None))
-
-    return msg, aanvraag_type
-    # Add any remaining columns from the Excel that were not explicitly
-    # mapped above. This makes the generator adapt to uploads where the
-    # header contains extra fields — each non-empty extra column becomes
-    # a direct child element of `UwvZwMeldingInternBody` with a
-    # sanitized tag name derived from the header.
-    known_keys = {
-        "IndAlleenControleUzs",
-        "Loonheffingennummer",
-        "IndienerNaam",
-        "CdRolKetenpartij",
-        "CdSrtIndiener",
-        "NaamSoftwarePakket",
-        "VersieSoftwarePakket",
-        "BerichtkenmerkIndiener",
-        "VolgNr",
-        "Kp_NaamContactpersoon",
-        "Kp_TelefoonnrContactpersoonAfd",
-        "BSN",
-        "Geboortedatum",
-        "IndOverlijden",
-        "Geslacht",
-        "EersteVoornaam",
-        "Voorletters",
-        "Voorvoegsel",
-        "Achternaam",
-        "Telefoonnr",
-        "TelefoonnrMobiel",
-        "TelefoonnrBuitenland",
-        "Contact_NaamContactpersoonAfd",
-        "Contact_Geslacht",
-        "Contact_TelefoonnrContactpersoonAfd",
-        "Contact_NrLokaleVestiging",
-        "Contact_EMailAdres",
-        "IndVerzoekTotIntrekken",
-        "ReferentieMelding",
-        "DatTijdOpstellenMelding",
+    ("date", "mz", "DatTijdOpstellenMelding", ("DatTijdOpstellenMelding",), False),
+    (
+        "date",
+        "mz",
         "DatOntvangstMeldingWerkgever",
-        "DatEersteAoDag",
-        "ToelichtingMelding",
+        ("DatOntvangstMeldingWerkgever",),
+        True,
+    ),
+    ("date", "mz", "DatEersteAoDag", ("DatEersteAoDag",), True),
+    ("text", "mz", "ToelichtingMelding", ("ToelichtingMelding",), None),
+    (
+        "ind_jn",
+        "mz",
         "IndWerkverplichtingEersteAoDag",
-        "IndDirecteUitkering",
-        "CdRedenAangifteAo",
-        "CdRedenZiekmelding",
+        ("IndWerkverplichtingEersteAoDag",),
+        None,
+    ),
+    ("ind_jn", "mz", "IndDirecteUitkering", ("IndDirecteUitkering",), None),
+    ("text", "mz", "CdRedenAangifteAo", ("CdRedenAangifteAo",), None),
+    ("cd_reden", "mz", "CdRedenZiekmelding", ("CdRedenZiekmelding",), None),
+    (
+        "text",
+        "mz",
         "AantGewerkteUrenEersteAoDag",
+        ("AantGewerkteUrenEersteAoDag",),
+        None,
+    ),
+    (
+        "text",
+        "mz",
         "AantRoosterurenEersteAoDag",
-        "IndWerkdagOpZaterdag",
-        "IndWerkdagOpZondag",
+        ("AantRoosterurenEersteAoDag",),
+        None,
+    ),
+    ("ind_jn", "mz", "IndWerkdagOpZaterdag", ("IndWerkdagOpZaterdag",), None),
+    ("ind_jn", "mz", "IndWerkdagOpZondag", ("IndWerkdagOpZondag",), None),
+    (
+        "text",
+        "mz",
         "BedrSvLoonGedWerkenEersteAoDag",
-        "CdRedenRegres",
+        ("BedrSvLoonGedWerkenEersteAoDag",),
+        None,
+    ),
+    ("text", "mz", "CdRedenRegres", ("CdRedenRegres",), None),
+    (
+        "text",
+        "mz",
         "OmsRedenTeLateAanvraagUitkering",
+        ("OmsRedenTeLateAanvraagUitkering",),
+        None,
+    ),
+    (
+        "text",
+        "mz",
         "GemiddeldAantWerkurenPerWeek",
+        ("GemiddeldAantWerkurenPerWeek",),
+        None,
+    ),
+    (
+        "text",
+        "mz",
         "IndEDnstvrbndCtrTijdensZiekte",
-        "AE_Naam",
-        "Bankrekeningnr",
-        "BIC",
-        "Rekeningnummer (IBAN)",
-        "IBAN",
-        "CdRisicopremiegroep",
-        "CdSectorOsv",
-        "Volgnr",
-        "IndLoonheffingskorting",
-        "Personeelsnr",
-        "NaamBeroepOngecodeerd",
-        "CdAardArbv",
-        "CdLbtabel",
-        "DatB",
-        "AantLoonwachtdagen",
+        ("IndEDnstvrbndCtrTijdensZiekte",),
+        None,
+    ),
+    # AdministratieveEenheid
+    ("group", "msg", "AdministratieveEenheid", (), "ae"),
+    ("text", "ae", "Loonheffingennr", ("Loonheffingennummer",), None),
+    ("text", "ae", "Naam", ("AE_Naam",), None),
+    ("group", "ae", "Bankrekening", (), "bank"),
+    ("text", "bank", "Bankrekeningnr", ("Bankrekeningnr",), None),
+    ("text", "bank", "Bic", ("BIC", "Bic"), None),
+    ("text", "bank", "Iban", ("Rekeningnummer (IBAN)", "IBAN"), None),
+    ("group", "ae", "SectorRisicogroep", (), "sr"),
+    ("text", "sr", "CdRisicopremiegroep", ("CdRisicopremiegroep",), None),
+    ("text", "sr", "CdSectorOsv", ("CdSectorOsv",), None),
+    ("group", "ae", "Arbeidsverhouding", (), "arb"),
+    ("text", "arb", "Volgnr", ("Volgnr",), None),
+    ("text", "arb", "IndLoonheffingskorting", ("IndLoonheffingskorting",), None),
+    ("text", "arb", "Personeelsnr", ("Personeelsnr",), None),
+    ("text", "arb", "NaamBeroepOngecodeerd", ("NaamBeroepOngecodeerd",), None),
+    ("text", "arb", "CdAardArbv", ("CdAardArbv",), None),
+    ("text", "arb", "CdLbtabel", ("CdLbtabel",), None),
+    ("date", "arb", "DatB", ("DatB",), True),
+    ("text", "arb", "AantLoonwachtdagen", ("AantLoonwachtdagen",), None),
+    (
+        "text",
+        "arb",
         "PercLoondoorbetalingTijdensAo",
-        "IndArbeidsgehandicapt",
-    }
+        ("PercLoondoorbetalingTijdensAo",),
+        None,
+    ),
+    ("text", "arb", "IndArbeidsgehandicapt", ("IndArbeidsgehandicapt",), None),
+)
+
+
+def _emit_text(lines, ind, parent, tag, expr, default=None):
+    # empty cells emit no element; `default` fills fields that must always
+    # have a value
+    lines.append(f"{ind}v = {expr}")
+    lines.append(f'{ind}v = "" if v is None else str(v).strip()')
+    if default is None:
+        lines.append(f"{ind}if v:")
+        lines.append(f"{ind}    SubElement({parent}, {tag!r}).text = v")
+    else:
+        lines.append(f"{ind}SubElement({parent}, {tag!r}).text = v or {default!r}")
 
-    import re
-
-    def _sanitize_tag(name: str) -> str:
-        # Remove leading/trailing whitespace
-        t = name.strip()
-        # replace spaces and slashes with underscores
-        t = re.sub(r"[\s/]+", "_", t)
-        # remove characters that are invalid in XML names
-        t = re.sub(r"[^0-9A-Za-z_\-\.:]", "", t)
-        # XML names must not start with a digit or punctuation; prefix if needed
-        if re.match(r"^[0-9\-\.:]", t):
-            t = f"F_{t}"
-        # avoid empty tag name
-        if not t:
-            t = "Field"
-        return t
-
-    for key, val in record.items():
-        if key in known_keys:
-            continue
-        if val is None:
-            continue
-        if isinstance(val, str) and val.strip() == "":
+
+def _emit_field(lines, ind, op, parent, t, exprs, arg, q):
+    """Append the source for one non-group `_BODY_LAYOUT` entry.
+
+    `t` is the entry's Clark tag and `exprs` the `row[i]` reads of its columns
+    that are present in the sheet.
+    """
+    if op == "text":
+        if exprs:
+            _emit_text(lines, ind, parent, t, exprs[0], arg)
+        elif arg is not None:
+            lines.append(f"{ind}SubElement({parent}, {t!r}).text = {arg!r}")
+    elif not exprs:
+        if op == "cd_type":
+            lines.append(f"{ind}aanvraag_type = {arg!r}")
+            lines.append(f"{ind}SubElement({parent}, {t!r}).text = aanvraag_type")
+    elif op == "date":
+        fmt = "%Y%m%d" if arg else "%Y%m%d%H%M%S"
+        lines += [
+            f"{ind}v = {exprs[0]}",
+            f"{ind}if v is not None:",
+            f"{ind}    if isinstance(v, datetime):",
+            f"{ind}        v = v.strftime({fmt!r})",
+            f"{ind}    else:",
+            f"{ind}        v = _format_date_text(str(v), {arg!r})",
+            f"{ind}    if v is not None:",
+            f"{ind}        SubElement({parent}, {t!r}).text = v",
+        ]
+    elif op in ("ind_jn", "cd_reden"):
+        conv = (
+            "_normalize_ind_jn(v)"
+            if op == "ind_jn"
+            else "_map_cd_reden_ziekmelding(str(v).strip())"
+        )
+        lines.append(f"{ind}v = {exprs[0]}")
+        lines.append(f"{ind}if v:")
+        _emit_text(lines, ind + "    ", parent, t, conv)
+    elif op == "lhn":
+        lines.append(f"{ind}lhn = {' or '.join(exprs)}")
+        lines.append(f"{ind}if lhn:")
+        lines.append(f"{ind}    lhn = str(lhn)")
+        _emit_text(lines, ind + "    ", parent, q["FiscaalNr"], "lhn[:9]")
+        _emit_text(lines, ind + "    ", parent, q["Loonheffingennr"], "lhn")
+    elif op == "cd_type":
+        lines += [
+            f"{ind}aanvraag_type = {arg!r}",
+            f"{ind}for v in ({', '.join(exprs)},):",
+            f"{ind}    if v is not None:",
+            f"{ind}        v = str(v).strip()",
+            f"{ind}        if v:",
+            # Map Digipoort to OTP3; for ZBM, VM, etc., use as-is
+            f'{ind}            aanvraag_type = "OTP3" if v.upper() == "DIGIPOORT" '
+            "else v",
+            f"{ind}            break",
+            f"{ind}SubElement({parent}, {t!r}).text = aanvraag_type",
+        ]
+    else:
+        raise ValueError(f"unknown layout op {op!r}")
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_builder(columns: tuple[tuple[str, int], ...], ns_body: str):
+    """Generate a row builder specialised to one sheet layout.
+
+    `columns` are the (header, position) pairs of the sheet. Every entry of
+    `_BODY_LAYOUT` is resolved against them once: fields whose column is
+    missing are dropped (or become their constant default) and the rest turn
+    into straight-line `row[i]` reads with the Clark tags inlined, so a row
+    costs no dict lookups or helper calls.
+    """
+    pos = dict(columns)
+    q = BODY_Q if ns_body == NS_BODY else _QNames(ns_body)
+
+    def cols(names):
+        return [f"row[{pos[n]}]" for n in names if n in pos]
+
+    lines = ["def build(row):"]
+    msg_tag = q["UwvZwMeldingInternBody"]
+    # The default namespace is declared on the message element itself, so it
+    # serializes the same way standalone, inside an Envelope or streamed
+    if USING_LXML:
+        lines.append(f"    msg = Element({msg_tag!r}, nsmap={{None: {ns_body!r}}})")
+    else:
+        lines.append(f"    msg = Element({msg_tag!r})")
+    ind = "    "
+    group_if = skipped = None
+    for op, parent, tag, names, arg in _BODY_LAYOUT:
+        if parent == skipped:
             continue
-        tag = _sanitize_tag(str(key))
-        ET.SubElement(msg, tag).text = str(val)
+        if group_if is not None and parent != group_if:
+            ind, group_if = "    ", None
+        exprs = cols(names)
+        t = q[tag] if tag else None
+        if op == "group":
+            lines.append(f"{ind}{arg} = SubElement({parent}, {t!r})")
+        elif op == "group_if":
+            if not exprs:
+                skipped = arg
+                continue
+            lines.append(f"{ind}if {' or '.join(exprs)}:")
+            ind += "    "
+            group_if = arg
+            lines.append(f"{ind}{arg} = SubElement({parent}, {t!r})")
+        else:
+            _emit_field(lines, ind, op, parent, t, exprs, arg, q)
+    lines.append("    return msg, aanvraag_type")
+
+    source = "\n".join(lines) + "\n"
+    namespace = {
+        "Element": ET.Element,
+        "SubElement": ET.SubElement,
+        "datetime": datetime,
+        "_format_date_text": _format_date_text,
+        "_normalize_ind_jn": _normalize_ind_jn,
+        "_map_cd_reden_ziekmelding": _map_cd_reden_ziekmelding,
+    }
+    exec(compile(source, f"<message builder {len(pos)} columns>", "exec"), namespace)
+    build = namespace["build"]
+    build.source = source  # handy when debugging a mapping
+    return build
+
+
+def message_builder(index: dict[str, int], ns_body: str = NS_BODY):
+    """Return `build(row) -> (element, aanvraag_type)` for rows laid out as `index`.
+
+    `index` maps header name -> position (see `header_index`); the builder is
+    generated once per distinct layout and namespace.
+    """
+    return _compile_builder(tuple(index.items()), ns_body)
+
+
+def build_message_element(
+    record: dict[str, str] | RowView, ns_body: str
+) -> tuple[ET.Element, str]:
+    """Create a `UwvZwMeldingInternBody` element (without Envelope/Body wrapper).
+
+    Returns tuple of (element, aanvraag_type) for use in filename generation.
+
+    This function is intentionally minimal and maps Excel columns to
+    the child elements used in the sample XML; the mapping itself lives in
+    `_BODY_LAYOUT`. Callers with many rows of the same layout can take
+    `message_builder(index, ns_body)` once and call it per row.
+    """
+    if isinstance(record, RowView):
+        index, row = record.index, record.row
+    else:
+        index = {k: i for i, k in enumerate(record)}
+        row = tuple(record.values())
+    return message_builder(index, ns_body)(row)
+
+
+# Sheets with fewer rows are built in-process: starting the worker pool costs
+# more than it saves
+_PARALLEL_MIN_ROWS = 500
+_PARALLEL_CHUNKSIZE = 64
+_worker_build = None
+
+
+def _init_build_worker(headers: tuple) -> None:
+    global _worker_build
+    _worker_build = message_builder(header_index(headers), NS_BODY)
+
+
+def _build_message_bytes(row: tuple) -> tuple[bytes | None, str | None, str | None]:
+    """Worker side of the parallel build: (xml_bytes, aanvraag_type, error).
 
-    # This code is unreachable due to earlier return, but kept for reference
-    # return msg, aanvraag_type
+    The message is returned serialized; bytes pickle far cheaper than an
+    element tree and the parent re-parses them in C.
+    """
+    try:
+        msg, aanvraag_type = _worker_build(row)
+    except Exception as exc:
+        return None, None, str(exc)
+    return ET.tostring(msg), aanvraag_type, None
 
 
 def main():
@@ -648,68 +1060,139 @@ def main():
         action="store_true",
         help="Open workbook with openpyxl data_only=True to prefer cached values over formulas",
     )
+    parser.add_argument(
+        "--pretty",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Indent the generated XML (default: indented in single mode, "
+        "compact in bulk mode)",
+    )
     args = parser.parse_args()
+    # single files are opened by people, bulk files go straight to UZS
+    pretty = args.mode == "single" if args.pretty is None else args.pretty
 
     src = os.path.abspath(args.input)
     out_dir = os.path.abspath(args.outdir)
     log_path = os.path.abspath(args.log)
 
-    # Read rows and build message elements
-    messages = []
-    rows, formula_count = read_excel_rows(src, data_only=args.data_only)
-    for rec in rows:
-        try:
-            # build per-row message element (namespaced)
-            _, _, ns_body = _namespaces()
-            msg, aanvraag_type = build_message_element(rec, ns_body)
-            messages.append((rec, msg, aanvraag_type))
-        except Exception as exc:
-            append_log(
-                log_path,
-                f"{datetime.now(timezone.utc).isoformat()}\tERROR_BUILD_MSG\t{exc}",
-            )
+    headers, rows, formula_count = read_excel_table(src, data_only=args.data_only)
+    index = header_index(headers)
 
-    processed = 0
-    if args.mode == "bulk":
-        # create one envelope containing all message bodies
-        bodies = [m for (_, m, _) in messages]
-        # Use first message's type for bulk filename, or default to BULK
-        bulk_type = messages[0][2] if messages else "BULK"
-        envelope = build_envelope_with_header_and_bodies(bodies)
-        saved = save_envelope(envelope, out_dir, "bulk", bulk_type)
-        append_log(
-            log_path,
-            f"{datetime.now(timezone.utc).isoformat()}Z\t{saved}\tSUCCESS\t{len(bodies)}",
-        )
-        processed = len(bodies)
-        if formula_count:
-            append_log(
-                log_path,
-                f"{datetime.now(timezone.utc).isoformat()}Z\tSANITIZED_FORMULAS\t{formula_count}",
-            )
-    else:
-        # single mode: one envelope per message
-        for idx, (rec, m, aanvraag_type) in enumerate(messages, start=1):
+    # directories are created once here; one log handle for the whole run
+    # instead of an open/close per log line
+    os.makedirs(out_dir, exist_ok=True)
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    log_fh = open(log_path, "a", encoding="utf-8", buffering=1 << 16)
+
+    def log(line: str) -> None:
+        log_fh.write(line + "\n")
+
+    def log_build_error(exc):
+        log(f"{datetime.now(timezone.utc).isoformat()}\tERROR_BUILD_MSG\t{exc}")
+
+    def iter_messages():
+        """Build message elements row by row, logging rows that fail."""
+        workers = os.cpu_count() or 1
+        if workers > 1 and len(rows) >= _PARALLEL_MIN_ROWS:
+            # rows are independent: build them on all cores, in row order
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_build_worker,
+                initargs=(headers,),
+            ) as pool:
+                results = pool.map(
+                    _build_message_bytes, rows, chunksize=_PARALLEL_CHUNKSIZE
+                )
+                for row, (data, aanvraag_type, error) in zip(rows, results):
+                    if error is not None:
+                        log_build_error(error)
+                        continue
+                    yield RowView(index, row), ET.fromstring(data), aanvraag_type
+            return
+        _, _, ns_body = _namespaces()
+        # generated once for this sheet's columns, then called per row
+        build = message_builder(index, ns_body)
+        for row in rows:
+            rec = RowView(index, row)
             try:
-                env = build_envelope_with_header_and_bodies([m])
-                bsn = rec.get("BSN") or f"row{idx}"
-                safe_bsn = str(bsn).replace(" ", "_")
-                saved = save_envelope(env, out_dir, safe_bsn, aanvraag_type)
-                append_log(
-                    log_path,
-                    f"{datetime.now(timezone.utc).isoformat()}Z\t{saved}\tSUCCESS",
+                # build per-row message element (namespaced)
+                msg, aanvraag_type = build(row)
+            except Exception as exc:
+                log_build_error(exc)
+                continue
+            yield rec, msg, aanvraag_type
+
+    try:
+        processed = 0
+        if args.mode == "bulk":
+            # stream all message bodies into one envelope; the first message's type
+            # names the bulk file (or BULK when nothing could be built)
+            messages = iter_messages()
+            first = next(messages, None)
+            bulk_type = first[2] if first else "BULK"
+            path = envelope_path(out_dir, "bulk", bulk_type)
+            with EnvelopeWriter(path, pretty=pretty) as writer:
+                if first is not None:
+                    writer.append(first[1])
+                for _, m, _ in messages:
+                    writer.append(m)
+            log(
+                f"{datetime.now(timezone.utc).isoformat()}Z\t{path}\tSUCCESS\t{writer.count}"
+            )
+            processed = writer.count
+            if formula_count:
+                log(
+                    f"{datetime.now(timezone.utc).isoformat()}Z\tSANITIZED_FORMULAS\t{formula_count}"
                 )
+        else:
+            # single mode: one envelope per message. Envelopes are built here and
+            # serialized + written on worker threads (lxml releases the GIL in
+            # tostring); at most a few envelopes per worker are held in memory and
+            # results are logged in row order.
+            workers = (os.cpu_count() or 1) if USING_LXML else 1
+            pending = deque()
+
+            def log_result(future):
+                nonlocal processed
+                try:
+                    saved = future.result()
+                except Exception as exc:
+                    log(f"{datetime.now(timezone.utc).isoformat()}Z\tERROR_SAVE\t{exc}")
+                    return
+                log(f"{datetime.now(timezone.utc).isoformat()}Z\t{saved}\tSUCCESS")
                 processed += 1
-            except Exception as exc:
-                append_log(
-                    log_path,
-                    f"{datetime.now(timezone.utc).isoformat()}Z\tERROR_SAVE\t{exc}",
+
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for idx, (rec, m, aanvraag_type) in enumerate(iter_messages(), start=1):
+                    try:
+                        env = build_envelope_with_header_and_bodies([m])
+                    except Exception as exc:
+                        log(
+                            f"{datetime.now(timezone.utc).isoformat()}Z\tERROR_SAVE\t{exc}"
+                        )
+                        continue
+                    bsn = rec.get("BSN") or f"row{idx}"
+                    safe_bsn = str(bsn).replace(" ", "_")
+                    pending.append(
+                        pool.submit(
+                            save_envelope,
+                            env,
+                            out_dir,
+                            safe_bsn,
+                            aanvraag_type,
+                            pretty=pretty,
+                        )
+                    )
+                    if len(pending) >= workers * 4:
+                        log_result(pending.popleft())
+                while pending:
+                    log_result(pending.popleft())
+            if formula_count:
+                log(
+                    f"{datetime.now(timezone.utc).isoformat()}Z\tSANITIZED_FORMULAS\t{formula_count}"
                 )
-        if formula_count:
-            append_log(
-                log_path,
-                f"{datetime.now(timezone.utc).isoformat()}Z\tSANITIZED_FORMULAS\t{formula_count}",
-            )
+    finally:
+        log_fh.close()
 
     print(f"Processed {processed} rows; outputs written to: {out_dir}")
 
@@ -6,7 +6,8 @@ This script provides three minimal functions:
  - generate_xml(data): build an XML Element from a fixed template
  - save_and_log(element, out_dir): save the XML to a timestamped file and log the result
 
-No external dependencies; uses only Python standard library.
+Uses lxml for building and writing the XML when it is installed and falls
+back to the Python standard library otherwise.
 """
 
 from __future__ import annotations
@@ -15,9 +16,17 @@ import argparse
 import csv
 import json
 import os
-import xml.etree.ElementTree as ET
 from datetime import datetime
 
+try:
+    from lxml import etree as ET
+
+    USING_LXML = True
+except ImportError:  # pragma: no cover - stdlib fallback
+    import xml.etree.ElementTree as ET
+
+    USING_LXML = False
+
 
 def read_input(input_path: str | None = None) -> list[dict[str, str]]:
     """Read input data from JSON or CSV file. If no path is provided,
@@ -93,21 +102,6 @@ def generate_xml(records: list[dict[str, str]]) -> ET.Element:
     return envelope
 
 
-def _indent(elem: ET.Element, level: int = 0) -> None:
-    """Simple pretty-printer for ElementTree (in-place)."""
-    i = "\n" + level * "  "
-    if len(elem):
-        if not elem.text or not elem.text.strip():
-            elem.text = i + "  "
-        for child in elem:
-            _indent(child, level + 1)
-        if not child.tail or not child.tail.strip():
-            child.tail = i
-    else:
-        if level and (not elem.tail or not elem.tail.strip()):
-            elem.tail = i
-
-
 def save_and_log(element: ET.Element, out_dir: str = "output") -> str:
     """Save the XML Element to a timestamped file under out_dir and append a small log entry.
 
@@ -119,11 +113,16 @@ def save_and_log(element: ET.Element, out_dir: str = "output") -> str:
     filename = f"generated_{ts}.xml"
     path = os.path.join(out_dir, filename)
 
-    # Pretty-print then write as UTF-8 with XML declaration
-    _indent(element)
+    # Pretty-print then write as UTF-8 with XML declaration; lxml indents
+    # while serializing, ElementTree needs the whitespace added first
+    if not USING_LXML:
+        ET.indent(element)
     tree = ET.ElementTree(element)
     try:
-        tree.write(path, encoding="utf-8", xml_declaration=True)
+        if USING_LXML:
+            tree.write(path, encoding="utf-8", xml_declaration=True, pretty_print=True)
+        else:
+            tree.write(path, encoding="utf-8", xml_declaration=True)
         status = "SUCCESS"
     except Exception as exc:  # Keep minimal error handling and surface the issue
         status = f"FAIL: {exc}"
@@ -144,9 +143,7 @@ def save_and_log(element: ET.Element, out_dir: str = "output") -> str:
 
 
 def main():
-    parser = argparse.ArgumentParser(
-        description="Minimal XML generator (standard library only)"
-    )
+    parser = argparse.ArgumentParser(description="Minimal XML generator")
     parser.add_argument("--input", help="Path to input .json or .csv file (optional)")
     parser.add_argument(
         "--outdir",
@@ -1,4 +1,5 @@
 import io
+import re
 import sys
 from pathlib import Path
 
@@ -8,6 +9,11 @@ sys.path.insert(0, str(ROOT))
 
 from web.app import app
 
+# patterns the response HTML is scanned with
+_FN_RE = re.compile(r"([\w\-]+_\d{8}_\d{6}(?:_\d+)?\.xml)")
+_ERR_RE = re.compile(r"Regel \d+: [^<\n]+")
+_ERR_COUNT_RE = re.compile(r"Er waren\s*(\d+) fouten")
+
 EXCEL = ROOT / "docs" / "Input XML electr ziekmeldinge.xlsx"
 if not EXCEL.exists():
     print("ERROR: sample Excel not found at", EXCEL)
@@ -34,18 +40,16 @@ with app.test_client() as client:
     out.write_bytes(resp.get_data())
     print("Wrote response HTML to", out)
     txt = resp.get_data(as_text=True)
-    import re
-
-    fns = re.findall(r"([\w\-]+_\d{8}_\d{6}\.xml)", txt)
+    fns = _FN_RE.findall(txt)
     print("Found generated filenames:", fns)
     # Extract explicit error lines produced by our code
-    errs = re.findall(r"Regel \d+: [^<\n]+", txt)
+    errs = _ERR_RE.findall(txt)
     if errs:
         print("\nErrors found:")
         for e in errs:
             print("-", e)
     else:
-        m = re.search(r"Er waren\s*(\d+) fouten", txt)
+        m = _ERR_COUNT_RE.search(txt)
         if m:
             print("Errors count:", m.group(1))
 
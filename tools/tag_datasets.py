@@ -21,7 +21,16 @@ from pathlib import Path
 
 import yaml
 
+try:  # LibYAML's C loader/dumper when PyYAML was built with it
+    from yaml import CSafeDumper as _Dumper
+    from yaml import CSafeLoader as _Loader
+except ImportError:  # pure-Python PyYAML
+    from yaml import SafeDumper as _Dumper
+    from yaml import SafeLoader as _Loader
+
 DEFAULT_TYPES = ["ZBM", "VM", "Digipoort"]
+# any of these fields filled in marks a dataset as ZBM/VM material
+_ZBM_VM_SIGNALS = ("Iban", "Bic", "Loonheffingennr", "Loonheffingennummer", "BSN")
 
 
 def infer_types_from_record(record: dict):
@@ -38,17 +47,12 @@ def infer_types_from_record(record: dict):
     label = record.get("label") or record.get("Naam") or ""
     fields = record.get("fields") or record
 
-    # normalize string values
-    def has_nonempty(k):
-        v = fields.get(k) if isinstance(fields, dict) else None
-        return v is not None and str(v).strip() != ""
-
-    if has_nonempty("Iban") or has_nonempty("Bic"):
-        types.update(["ZBM", "VM"])
-    if has_nonempty("Loonheffingennr") or has_nonempty("Loonheffingennummer"):
-        types.update(["ZBM", "VM"])
-    if has_nonempty("BSN"):
-        types.update(["ZBM", "VM"])
+    # one pass over the signal fields, stopping at the first filled one
+    if isinstance(fields, dict) and any(
+        (v := fields.get(k)) is not None and str(v).strip() != ""
+        for k in _ZBM_VM_SIGNALS
+    ):
+        types.update(("ZBM", "VM"))
     lbl = str(label).lower()
     if "digipoort" in lbl or "otp3" in lbl:
         types.add("Digipoort")
@@ -80,7 +84,7 @@ def main():
         print("Source file not found:", src)
         return 2
 
-    raw = yaml.safe_load(src.read_text(encoding="utf-8")) or {}
+    raw = yaml.load(src.read_text(encoding="utf-8"), Loader=_Loader) or {}
     datasets = []
     if (
         isinstance(raw, dict)
@@ -97,11 +101,10 @@ def main():
                 datasets = v
                 break
 
+    # datasets are tagged in place; the same list is dumped afterwards
     changed = 0
-    out = []
     for ds in datasets:
         if not isinstance(ds, dict):
-            out.append(ds)
             continue
         inferred = infer_types_from_record(ds)
         # By default we keep an empty inferred list (conservative). If the
@@ -122,12 +125,11 @@ def main():
         if sorted(current) != sorted(inferred):
             ds["types"] = inferred
             changed += 1
-        out.append(ds)
 
-    print(f"Datasets scanned: {len(out)}; updated: {changed}")
+    print(f"Datasets scanned: {len(datasets)}; updated: {changed}")
     if args.dry_run or not args.auto:
         # Print summary table
-        for ds in out:
+        for ds in datasets:
             label = (
                 ds.get("label") or (ds.get("fields") or {}).get("Naam") or ds.get("id")
             )
@@ -136,7 +138,12 @@ def main():
     if args.auto:
         dst = Path(args.output)
         dst.write_text(
-            yaml.safe_dump({"datasets": out}, sort_keys=False, allow_unicode=True),
+            yaml.dump(
+                {"datasets": datasets},
+                Dumper=_Dumper,
+                sort_keys=False,
+                allow_unicode=True,
+            ),
             encoding="utf-8",
         )
         print("Wrote:", dst)
@@ -1,9 +1,14 @@
 ## ROUTES verplaatst NA app-definitie (zie einde bestand)
 import datetime
-import io
+import functools
 import json
 import os
+import re
+import shutil
 import tempfile
+import threading
+import time
+from collections import Counter
 from pathlib import Path
 from zipfile import ZIP_DEFLATED, ZipFile
 
@@ -19,6 +24,7 @@ from flask import (
     session,
     url_for,
 )
+from flask.json.provider import DefaultJSONProvider
 
 try:
     from lxml import etree
@@ -32,6 +38,10 @@ try:
     import openpyxl
 except Exception:
     openpyxl = None
+try:  # optional, faster (de)serialization of the events log
+    import orjson
+except ImportError:
+    orjson = None
 from .utils import (
     _format_date_yyyymmdd,
     _get_success_rate,
@@ -47,6 +57,26 @@ app = Flask(
     static_folder=str(base / "static"),
 )
 
+if orjson is not None:
+
+    class _OrjsonProvider(DefaultJSONProvider):
+        """JSON provider for jsonify/get_json backed by orjson.
+
+        Output is compact with sorted keys.
+        """
+
+        _options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+
+        def dumps(self, obj, **kwargs) -> str:
+            return orjson.dumps(
+                obj, default=self.default, option=self._options
+            ).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = _OrjsonProvider(app)
+
 # Secret and session hardening
 # Prefer an environment-provided secret in production. If running in a
 # production environment (FLASK_ENV=production or U_XMLATOR_PROD=1) the
@@ -73,14 +103,44 @@ app.config.update(
     SESSION_COOKIE_HTTPONLY=True,
     SESSION_COOKIE_SECURE=(os.environ.get("U_XMLATOR_COOKIE_SECURE", "1") != "0"),
     SESSION_COOKIE_SAMESITE=os.environ.get("U_XMLATOR_SAMESITE", "Lax"),
+    # Behind a server that honours X-Sendfile (e.g. Apache mod_xsendfile) let it
+    # stream downloads from disk instead of passing the bytes through Python.
+    # send_file already answers repeat downloads with 304 (conditional/ETag).
+    USE_X_SENDFILE=os.environ.get("U_XMLATOR_X_SENDFILE") == "1",
 )
 
 
+# LibYAML's C loader when PyYAML was built with it (an order of magnitude faster)
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+# str(path) -> (st_mtime_ns, st_size, datasets); the YAML only changes when
+# someone edits it, so uploads and page loads reuse the parsed list
+_DATASETS_CACHE: dict[str, tuple[int, int, list]] = {}
+
+
 def load_datasets_yaml(path: Path):
-    if not path.exists():
+    """Return the normalized datasets from `path`, parsed once per file version.
+
+    The returned list is shared between callers and must be treated as read-only.
+    """
+    try:
+        st = path.stat()
+    except OSError:
         return []
+    key = str(path)
+    cached = _DATASETS_CACHE.get(key)
+    if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    result = _parse_datasets_yaml(path)
+    _DATASETS_CACHE[key] = (st.st_mtime_ns, st.st_size, result)
+    return result
+
+
+def _parse_datasets_yaml(path: Path):
     try:
-        raw = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+        # bytes: the loader detects the (UTF-8) encoding itself, no separate decode
+        raw = yaml.load(path.read_bytes(), Loader=_YAML_LOADER) or {}
         entries = raw.get("datasets") if isinstance(raw, dict) else raw
         if not entries:
             return []
@@ -150,6 +210,9 @@ def load_datasets_yaml(path: Path):
 DOWNLOADS_DIR = Path(__file__).parent / "static" / "downloads"
 DOWNLOADS_DIR.mkdir(parents=True, exist_ok=True)
 
+# Append-only log of generated files, read by the dashboard
+EVENTS_FILE = Path(__file__).parent / "xml_events.jsonl"
+
 # Limits for bulk zip requests (can be overridden by env vars)
 ZIP_MAX_FILES = int(os.environ.get("U_XMLATOR_MAX_ZIP_FILES", "50"))
 ZIP_MAX_TOTAL_SIZE = int(
@@ -159,47 +222,107 @@ ZIP_MAX_FILE_SIZE = int(
     os.environ.get("U_XMLATOR_MAX_ZIP_FILE_BYTES", str(10 * 1024 * 1024))
 )
 
-# One-time cleanup guard to avoid running cleanup during import
+# Fastest deflate level for the bulk archives: XML is very repetitive, so level 1
+# already shrinks it ~50x at half the CPU time of the default level 6
+_ZIP_COMPRESSLEVEL = 1
+
+# Map friendly form values to schema-allowed CdBerichtType codes.
+# ONLY Digipoort gets mapped to OTP3; all other types remain unchanged.
+_AANVRAAG_MAP = {"Digipoort": "OTP3"}
+# Known schema codes which we should accept as-is if present in the generated
+# message. If the generator wrote one of these codes already (e.g. 'VM' or
+# 'ZBM'), we won't override it with the selected `aanvraag_type`.
+_KNOWN_CDBERICHT_TYPES = frozenset(
+    {"KCC", "OTP1", "OTP3", "RFE", "RFV", "RFX", "VM", "ZBM", "KAAN", "ZBMA"}
+)
+
+if orjson is not None:
+    _event_loads = orjson.loads
+
+    def _event_line(ev: dict) -> str:
+        return orjson.dumps(ev).decode() + "\n"
+
+else:
+    _event_loads = json.loads
+
+    def _event_line(ev: dict) -> str:
+        return json.dumps(ev, ensure_ascii=False) + "\n"
+
+
+# Uploaded workbooks up to this size are kept in memory, larger ones spill to disk
+_UPLOAD_SPOOL_BYTES = 4 * 1024 * 1024
+
+# Fields the legacy Excel flow sets after filling the XML template
+_LEGACY_ROW_FIELDS = (
+    "DatEersteAoDag",
+    "IndDirecteUitkering",
+    "CdRedenAangifteAo",
+    "CdRedenZiekmelding",
+    "IndWerkdagOpZaterdag",
+    "IndWerkdagOpZondag",
+)
+
+# One-time guard for the downloads cleanup (setup thread or first index sweep)
 _CLEANUP_RUN = False
+_CLEANUP_MAX_AGE_MINUTES = 24 * 60
 
 
 def _cleanup_downloads(max_age_minutes: int = 60):
     """Remove files in DOWNLOADS_DIR older than max_age_minutes."""
     try:
-        cutoff = datetime.datetime.now() - datetime.timedelta(minutes=max_age_minutes)
-        for p in DOWNLOADS_DIR.iterdir():
-            try:
-                if p.is_file():
-                    mtime = datetime.datetime.fromtimestamp(p.stat().st_mtime)
-                    if mtime < cutoff:
-                        p.unlink()
-            except Exception:
-                continue
+        # compared as plain timestamps; DirEntry caches the type and stat
+        cutoff = (
+            datetime.datetime.now() - datetime.timedelta(minutes=max_age_minutes)
+        ).timestamp()
+        with os.scandir(DOWNLOADS_DIR) as it:
+            for entry in it:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                except Exception:
+                    continue
     except Exception:
         pass
 
 
-def save_xml(tree, aanvraag_type: str, filename: str):
+def save_xml(
+    xml_bytes: bytes, aanvraag_type: str, filename: str, events: list | None = None
+):
+    """Write already serialized XML to the output directory and log the event.
+
+    When `events` is given the event is appended to it instead of being written
+    right away; the caller flushes the batch with `_write_xml_events`.
+    """
     out_dir = get_output_directory()
     out_dir.mkdir(parents=True, exist_ok=True)
     out_path = out_dir / filename
-    tree.write(str(out_path), encoding="utf-8", xml_declaration=True)
+    out_path.write_bytes(xml_bytes)
     # Log event for dashboard and analytics
+    event = {
+        "tijdstip": datetime.datetime.now().isoformat(),
+        "filename": filename,
+        "aanvraag_type": aanvraag_type,
+        "output_path": str(out_path),
+        "size": len(xml_bytes),
+        "success": True,
+    }
+    if events is None:
+        _write_xml_events([event])
+    else:
+        events.append(event)
+    return out_path
+
+
+def _write_xml_events(events: list) -> None:
+    """Append `events` to `web/xml_events.jsonl` with a single write."""
+    if not events:
+        return
     try:
-        events_file = Path(__file__).parent / "xml_events.jsonl"
-        event = {
-            "tijdstip": datetime.datetime.now().isoformat(),
-            "filename": filename,
-            "aanvraag_type": aanvraag_type,
-            "output_path": str(out_path),
-            "size": out_path.stat().st_size if out_path.exists() else 0,
-            "success": True,
-        }
-        with open(events_file, "a", encoding="utf-8") as ef:
-            ef.write(json.dumps(event, ensure_ascii=False) + "\n")
+        lines = "".join(map(_event_line, events))
+        with open(EVENTS_FILE, "a", encoding="utf-8") as ef:
+            ef.write(lines)
     except Exception:
         pass
-    return out_path
 
 
 # Register optional admin blueprints if present
@@ -215,7 +338,7 @@ except Exception:
 @app.route("/")
 def index():
     # Pre-compute some dashboard values so tiles show data server-side even if JS fails
-    # Run one-time cleanup if necessary (lazy, avoids import-time decorators)
+    # Inline one-time cleanup when the cleanup thread is disabled
     try:
         _maybe_run_cleanup()
     except Exception:
@@ -225,8 +348,7 @@ def index():
     last_status = None
     last_time = None
     # Compute a basic success percentage from xml_events.jsonl as a fallback
-    events_file = Path(__file__).parent / "xml_events.jsonl"
-    success_rate = _get_success_rate(events_file)
+    success_rate = _get_success_rate(EVENTS_FILE)
 
     return render_template(
         "dashboard.html",
@@ -283,20 +405,49 @@ def ready():
     return jsonify({"ready": ok, "checks": checks}), status
 
 
+def _cleanup_loop(max_age_minutes: int) -> None:
+    """Sweep DOWNLOADS_DIR now and then every quarter of `max_age_minutes`."""
+    while True:
+        _cleanup_downloads(max_age_minutes=max_age_minutes)
+        time.sleep(max_age_minutes * 60 / 4)
+
+
+def _start_cleanup_thread():
+    """Start the downloads cleanup thread once per process, at app setup.
+
+    The sweep runs in a daemon thread so no request waits for it. Set
+    `U_XMLATOR_CLEANUP_THREAD=0` to skip the thread; the index page then sweeps
+    once inline instead (e.g. in tests).
+    """
+    global _CLEANUP_RUN
+    if _CLEANUP_RUN or os.environ.get("U_XMLATOR_CLEANUP_THREAD", "1") == "0":
+        return
+    _CLEANUP_RUN = True
+    threading.Thread(
+        target=_cleanup_loop,
+        args=(_CLEANUP_MAX_AGE_MINUTES,),
+        name="downloads-cleanup",
+        daemon=True,
+    ).start()
+
+
 def _maybe_run_cleanup():
-    """Run cleanup once per process when the index page is loaded.
+    """Sweep the downloads once on the first index request.
 
-    Avoids import-time decorator usage which caused compatibility errors in
-    some runtime environments. This runs lazily on first index request.
+    Only does anything when the cleanup thread was not started at setup
+    (`U_XMLATOR_CLEANUP_THREAD=0`).
     """
     global _CLEANUP_RUN
     if _CLEANUP_RUN:
         return
+    _CLEANUP_RUN = True
     try:
-        _cleanup_downloads(max_age_minutes=24 * 60)
+        _cleanup_downloads(max_age_minutes=_CLEANUP_MAX_AGE_MINUTES)
     except Exception:
         pass
-    _CLEANUP_RUN = True
+
+
+_start_cleanup_thread()
 
 
 def _load_generator_module():
@@ -321,6 +472,26 @@ def _load_generator_module():
         return None
 
 
+_TOK_RE = re.compile(r"[^0-9a-z]+")
+
+
+@functools.lru_cache(maxsize=1024, typed=True)
+def _header_token(s) -> str:
+    """Lower-cased header name with non-alphanumerics removed, for alias matching.
+
+    Cached: every row of a sheet carries the same headers.
+    """
+    if s is None:
+        return ""
+    return _TOK_RE.sub("", str(s).strip().lower())
+
+
+@functools.lru_cache(maxsize=64)
+def _build_key_map(headers: tuple) -> dict:
+    """Map header tokens to the original header names (shared, read-only)."""
+    return {_header_token(k): k for k in headers}
+
+
 def _normalize_record_for_generator(rec: dict) -> dict:
     """Normalize a row dict (header->value) to the canonical keys expected by the generator.
 
@@ -329,17 +500,9 @@ def _normalize_record_for_generator(rec: dict) -> dict:
     'Naam', 'Geboortedatum', 'Loonheffingennummer' etc. populated from common
     header aliases.
     """
-    import re
-
-    def tok(s: str) -> str:
-        if s is None:
-            return ""
-        t = str(s).strip().lower()
-        # remove non-alphanumeric
-        t = re.sub(r"[^0-9a-z]+", "", t)
-        return t
-
-    key_map = {tok(k): k for k in rec.keys()}
+    tok = _header_token
+    # rows of one sheet share their headers, so this is built once per sheet
+    key_map = _build_key_map(tuple(rec))
 
     def pick(*candidates):
         for c in candidates:
@@ -416,12 +579,11 @@ def _normalize_record_for_generator(rec: dict) -> dict:
             # fallback: look for fields in the original headers that look like 'voorletters' or 'initialen'
             if not parts:
                 for h in ("voorletters", "initialen", "initials", "voornaam"):
-                    # check original record keys (case-insensitive)
-                    for k, v in rec.items():
-                        if k is None:
-                            continue
-                        kk = tok(k)
-                        if kk == h and v:
+                    # original header with this token (case-insensitive), if any
+                    k = key_map.get(h)
+                    if k is not None:
+                        v = rec.get(k)
+                        if v:
                             parts.append(str(v).strip())
             if parts:
                 out["Naam"] = " ".join(parts)
@@ -450,6 +612,8 @@ def _is_valid_yyyymmdd(s: str) -> bool:
 
 
 _CACHED_XSD_SCHEMA = None
+# parsed XSD document behind _CACHED_XSD_SCHEMA, for request-local schemas
+_CACHED_XSD_DOC = None
 _LAST_XSD_ERROR = None
 
 
@@ -458,7 +622,7 @@ def _load_message_xsd():
 
     Returns an lxml.etree.XMLSchema object or None if not loadable.
     """
-    global _CACHED_XSD_SCHEMA
+    global _CACHED_XSD_SCHEMA, _CACHED_XSD_DOC
     if _CACHED_XSD_SCHEMA is not None:
         return _CACHED_XSD_SCHEMA
     xsd_path = (
@@ -475,7 +639,7 @@ def _load_message_xsd():
         doc = etree.parse(str(xsd_path), safe_parser)
         try:
             schema = etree.XMLSchema(doc)
-            _CACHED_XSD_SCHEMA = schema
+            _CACHED_XSD_SCHEMA, _CACHED_XSD_DOC = schema, doc
             return schema
         except Exception as se:
             app.logger.warning("XSD compile failed (safe parse): %s", se)
@@ -485,7 +649,7 @@ def _load_message_xsd():
         permissive_parser = etree.XMLParser(load_dtd=True, no_network=False)
         doc2 = etree.parse(str(xsd_path), permissive_parser)
         schema2 = etree.XMLSchema(doc2)
-        _CACHED_XSD_SCHEMA = schema2
+        _CACHED_XSD_SCHEMA, _CACHED_XSD_DOC = schema2, doc2
         return schema2
     except Exception as ex:
         app.logger.warning("Full XSD load/compile failed: %s", ex)
@@ -498,6 +662,17 @@ def _load_message_xsd():
         return None
 
 
+def _request_message_xsd():
+    """Compile a new message XMLSchema from the cached XSD document, or None.
+
+    `validate()` and `error_log` of the shared schema are not safe to use from
+    concurrent request threads; a schema of its own is (about 2 ms to compile).
+    """
+    if _load_message_xsd() is None:
+        return None
+    return etree.XMLSchema(_CACHED_XSD_DOC)
+
+
 def _validate_generator_record(rec: dict) -> list:
     """Validate a normalized record (keys like 'BSN','Naam','DatEersteAoDag').
 
@@ -598,36 +773,42 @@ def logo():
     return "", 404
 
 
-@app.route("/genereer_xml")
-def genereer_xml():
-    """Excel upload page with results below"""
-    # Get existing generated files
+def _list_generated_xml(out_dir: Path) -> list[dict]:
+    """List the XML files in `out_dir` for the results table, newest first."""
     generated = []
     try:
-        out_dir = get_output_directory()
-        if out_dir.exists():
-            for f in out_dir.glob("*.xml"):
+        with os.scandir(out_dir) as it:
+            for entry in it:
+                # normcase: the match is case-insensitive on Windows, like glob
+                if not os.path.normcase(entry.name).endswith(".xml"):
+                    continue
                 try:
-                    generated.append(
-                        {
-                            "tijdstip": datetime.datetime.fromtimestamp(
-                                f.stat().st_mtime
-                            ).isoformat(),
-                            "filename": f.name,
-                            "output_path": str(f),
-                            "size": f.stat().st_size,
-                        }
-                    )
-                except Exception:
+                    st = entry.stat()  # one stat for both mtime and size
+                except OSError:
                     continue
-        generated = sorted(
-            generated, key=lambda x: x.get("tijdstip") or "", reverse=True
-        )
-    except Exception:
-        generated = []
+                generated.append(
+                    {
+                        "tijdstip": datetime.datetime.fromtimestamp(
+                            st.st_mtime
+                        ).isoformat(),
+                        "filename": entry.name,
+                        "output_path": entry.path,
+                        "size": st.st_size,
+                    }
+                )
+    except OSError:
+        return []
+    generated.sort(key=lambda x: x["tijdstip"], reverse=True)
+    return generated
 
-    events_file = Path(__file__).parent / "xml_events.jsonl"
-    success_rate = _get_success_rate(events_file)
+
+@app.route("/genereer_xml")
+def genereer_xml():
+    """Excel upload page with results below"""
+    # Get existing generated files
+    generated = _list_generated_xml(get_output_directory())
+
+    success_rate = _get_success_rate(EVENTS_FILE)
 
     zip_limits = {
         "max_files": ZIP_MAX_FILES,
@@ -647,29 +828,7 @@ def genereer_xml():
 def genereer_xml_json():
     """JSON upload page with results below"""
     # Get existing generated files
-    generated = []
-    try:
-        out_dir = get_output_directory_json()
-        if out_dir.exists():
-            for f in out_dir.glob("*.xml"):
-                try:
-                    generated.append(
-                        {
-                            "tijdstip": datetime.datetime.fromtimestamp(
-                                f.stat().st_mtime
-                            ).isoformat(),
-                            "filename": f.name,
-                            "output_path": str(f),
-                            "size": f.stat().st_size,
-                        }
-                    )
-                except Exception:
-                    continue
-        generated = sorted(
-            generated, key=lambda x: x.get("tijdstip") or "", reverse=True
-        )
-    except Exception:
-        generated = []
+    generated = _list_generated_xml(get_output_directory_json())
 
     zip_limits = {
         "max_files": ZIP_MAX_FILES,
@@ -740,20 +899,7 @@ def upload_json():
 
     # Bepaal aanvraagtype
     form_aanvraag_type = request.form.get("aanvraag_type") or "ZBM"
-    aanvraag_map = {"Digipoort": "OTP3"}
-    _KNOWN_CDBERICHT_TYPES = {
-        "KCC",
-        "OTP1",
-        "OTP3",
-        "RFE",
-        "RFV",
-        "RFX",
-        "VM",
-        "ZBM",
-        "KAAN",
-        "ZBMA",
-    }
-    cd_bericht_default = aanvraag_map.get(form_aanvraag_type, form_aanvraag_type)
+    cd_bericht_default = _AANVRAAG_MAP.get(form_aanvraag_type, form_aanvraag_type)
     validate_flag = str(request.form.get("validate", "on")).strip().lower() in (
         "1",
         "true",
@@ -776,6 +922,8 @@ def upload_json():
     try:
         ns_soap, ns_uwvh, ns_body = gen._namespaces()
         generated = []
+        # full paths of the generated files, zipped without searching for them
+        saved_paths = []
         errors = []
 
         out_dir = get_output_directory_json()
@@ -800,7 +948,7 @@ def upload_json():
                     or rec_norm.get("Type")
                 )
                 desired = (
-                    aanvraag_map.get(excel_cd, excel_cd)
+                    _AANVRAAG_MAP.get(excel_cd, excel_cd)
                     if excel_cd
                     else cd_bericht_default
                 )
@@ -857,8 +1005,11 @@ def upload_json():
                 if "bulk_aanvraag_type" in locals()
                 else form_aanvraag_type
             )
-            saved = gen.save_envelope(envelope, out_dir_str, "json_bulk", bulk_type)
+            saved = gen.save_envelope(
+                envelope, out_dir_str, "json_bulk", bulk_type, pretty=True
+            )
             generated.append(Path(saved).name)
+            saved_paths.append(saved)
 
             gen.append_log(
                 log_path,
@@ -870,11 +1021,11 @@ def upload_json():
             ts = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
             bulk_zip_name = f"bulk_json_{form_aanvraag_type}_{ts}.zip"
             bulk_zip_path = DOWNLOADS_DIR / bulk_zip_name
-            with ZipFile(bulk_zip_path, "w", ZIP_DEFLATED) as zf:
-                for fn in generated:
-                    fp = out_dir / fn
-                    if fp.exists():
-                        zf.write(str(fp), fn)
+            with ZipFile(
+                bulk_zip_path, "w", ZIP_DEFLATED, compresslevel=_ZIP_COMPRESSLEVEL
+            ) as zf:
+                for fp in saved_paths:
+                    zf.write(fp, os.path.basename(fp))
             flash(f"{len(bodies)} XML-bestand(en) gegenereerd uit JSON", "success")
 
         if errors:
@@ -937,12 +1088,13 @@ def upload_excel():
         return redirect(url_for("genereer_xml"))
 
     # Read workbook from uploaded file (file storage provides file-like object)
-    # Read bytes once so we can both parse in-memory and save a temp file
-    content = f.read()
+    # Spool the upload once: small workbooks stay in memory, larger ones go to a
+    # temp file; the same copy is reused for the generator's temp file below
+    upload = tempfile.SpooledTemporaryFile(max_size=_UPLOAD_SPOOL_BYTES)
+    f.save(upload)
+    upload.seek(0)
     try:
-        wb = openpyxl.load_workbook(
-            filename=io.BytesIO(content), read_only=True, data_only=True
-        )
+        wb = openpyxl.load_workbook(filename=upload, read_only=True, data_only=True)
     except Exception as e:
         flash("Kon Excel-bestand niet lezen: " + str(e), "danger")
         try:
@@ -974,30 +1126,10 @@ def upload_excel():
     # Determine aanvraag type (used by generator output mapping)
     # `form_aanvraag_type` preserves the raw UI selection (used for envelope sender)
     form_aanvraag_type = request.form.get("aanvraag_type") or "ZBM"
-    # Map friendly form values to schema-allowed CdBerichtType codes.
-    # ONLY Digipoort gets mapped to OTP3; all other types remain unchanged.
-    aanvraag_map = {
-        "Digipoort": "OTP3",
-    }
-    # Known schema codes which we should accept as-is if present in the generated
-    # message. If the generator wrote one of these codes already (e.g. 'VM' or
-    # 'ZBM'), we won't override it with the selected `aanvraag_type`.
-    _KNOWN_CDBERICHT_TYPES = {
-        "KCC",
-        "OTP1",
-        "OTP3",
-        "RFE",
-        "RFV",
-        "RFX",
-        "VM",
-        "ZBM",
-        "KAAN",
-        "ZBMA",
-    }
     # `cd_bericht_default` is the schema code we will use for CdBerichtType when
     # no explicit value is present in the Excel row. ONLY map Digipoort to OTP3;
     # all other types (ZBM, VM, etc.) keep their original code.
-    cd_bericht_default = aanvraag_map.get(form_aanvraag_type, form_aanvraag_type)
+    cd_bericht_default = _AANVRAAG_MAP.get(form_aanvraag_type, form_aanvraag_type)
     # Determine whether to validate records (checkbox on form). Default: True
     validate_flag = str(request.form.get("validate", "on")).strip().lower() in (
         "1",
@@ -1023,7 +1155,8 @@ def upload_excel():
             # save uploaded bytes to a tmp file for the generator
             tf = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx")
             try:
-                tf.write(content)
+                upload.seek(0)
+                shutil.copyfileobj(upload, tf)
                 tf.flush()
             finally:
                 tf.close()
@@ -1038,6 +1171,8 @@ def upload_excel():
             ns_soap, ns_uwvh, ns_body = gen._namespaces()
 
             generated = []
+            # full paths of the generated files, zipped without searching for them
+            saved_paths = []
             errors = []
             # Capture any XSD load error for UI; reset before per-request use
             global _LAST_XSD_ERROR
@@ -1133,7 +1268,7 @@ def upload_excel():
 
                             # Determine desired code: if Excel has explicit value, use it (mapped if needed)
                             if excel_cd:
-                                desired = aanvraag_map.get(excel_cd, excel_cd)
+                                desired = _AANVRAAG_MAP.get(excel_cd, excel_cd)
                             else:
                                 desired = cd_bericht_default
 
@@ -1230,7 +1365,9 @@ def upload_excel():
                     if "bulk_aanvraag_type" in locals()
                     else form_aanvraag_type
                 )
-                saved = gen.save_envelope(envelope, out_dir_str, "bulk", bulk_type)
+                saved = gen.save_envelope(
+                    envelope, out_dir_str, "bulk", bulk_type, pretty=True
+                )
                 try:
                     gen.append_log(
                         log_path,
@@ -1239,6 +1376,7 @@ def upload_excel():
                 except Exception:
                     pass
                 generated = [Path(saved).name]
+                saved_paths.append(saved)
             else:
                 gen_files = []
                 schema = _load_message_xsd() if validate_flag else None
@@ -1281,7 +1419,7 @@ def upload_excel():
 
                             # Determine desired code
                             if excel_cd:
-                                desired = aanvraag_map.get(excel_cd, excel_cd)
+                                desired = _AANVRAAG_MAP.get(excel_cd, excel_cd)
                             else:
                                 desired = cd_bericht_default
 
@@ -1352,7 +1490,7 @@ def upload_excel():
                         bsn = rec_norm.get("BSN") or f"row{idx}"
                         safe_bsn = str(bsn).replace(" ", "_")
                         saved = gen.save_envelope(
-                            env, out_dir_str, safe_bsn, msg_aanvraag_type
+                            env, out_dir_str, safe_bsn, msg_aanvraag_type, pretty=True
                         )
                         try:
                             gen.append_log(
@@ -1362,6 +1500,7 @@ def upload_excel():
                         except Exception:
                             pass
                         gen_files.append(Path(saved).name)
+                        saved_paths.append(saved)
                     except Exception as exc:
                         try:
                             gen.append_log(
@@ -1389,15 +1528,14 @@ def upload_excel():
                     bulk_zip_name = f"bulk_{form_aanvraag_type}_{ts}.zip"
                     DOWNLOADS_DIR.mkdir(parents=True, exist_ok=True)
                     zip_path = DOWNLOADS_DIR / bulk_zip_name
-                    from zipfile import ZIP_DEFLATED as _ZIP_DEF
-                    from zipfile import ZipFile as _ZipFile
-
-                    with _ZipFile(str(zip_path), "w", _ZIP_DEF) as zf:
-                        for fn in generated:
-                            # Search in output directory
-                            p = out_dir / fn
-                            if p.exists():
-                                zf.write(str(p), arcname=fn)
+                    with ZipFile(
+                        str(zip_path),
+                        "w",
+                        ZIP_DEFLATED,
+                        compresslevel=_ZIP_COMPRESSLEVEL,
+                    ) as zf:
+                        for fp in saved_paths:
+                            zf.write(fp, arcname=os.path.basename(fp))
                 except Exception:
                     bulk_zip_name = None
 
@@ -1466,176 +1604,206 @@ def upload_excel():
     except Exception:
         date1904 = False
 
+    # The bulk archive is opened with the first saved file and filled from the
+    # serialized bytes as rows are produced, instead of re-reading every file
+    # from the output directory afterwards
+    zf = None
+    bulk_zip_name = None
+    zip_ok = True
+    # dashboard events of this upload, appended to the log in one go
+    events = []
+    # normalized header keys for the fallback mapping; the headers are the same
+    # for every row
+    header_keys = [
+        (
+            str(h).strip().lower().replace(" ", "").replace("_", "")
+            if h is not None
+            else ""
+        )
+        for h in headers
+    ]
+    # one timestamp for the whole upload; row_index keeps the file names unique
+    batch_ts = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+
     row_index = 1
-    for row in rows:
-        row_index += 1
-        # If mapping is provided, pick values by index, otherwise try to find by normalized header names
-        r = {}
-        if mapping:
-            for mk in mapping:
-                idx = mapping.get(mk)
-                if idx is None:
-                    r[mk] = None
-                else:
-                    try:
-                        r[mk] = row[idx] if idx < len(row) else None
-                    except Exception:
+    # the events and the archive are flushed and closed even when a row raises
+    try:
+        for row in rows:
+            row_index += 1
+            # If mapping is provided, pick values by index, otherwise try to find
+            # by normalized header names
+            r = {}
+            if mapping:
+                for mk in mapping:
+                    idx = mapping.get(mk)
+                    if idx is None:
                         r[mk] = None
-        else:
-            # normalize header keys for fallback mapping
-            def norm(h):
-                return (
-                    (str(h).strip().lower().replace(" ", "").replace("_", ""))
-                    if h is not None
-                    else ""
+                    else:
+                        try:
+                            r[mk] = row[idx] if idx < len(row) else None
+                        except Exception:
+                            r[mk] = None
+            else:
+                for key, val in zip(header_keys, row):
+                    if key:
+                        r[key] = val
+
+            # map to required keys
+            data = {}
+            # Accept several aliases for BSN
+            bsn_val = None
+            for candidate in (
+                "bsn",
+                "burgerservicenr",
+                "burgerservicenummer",
+                "burgerservicenr",
+            ):
+                if r.get(candidate) is not None:
+                    bsn_val = r.get(candidate)
+                    break
+            data["BSN"] = str(bsn_val).strip() if bsn_val is not None else ""
+
+            # Name: accept direct 'naam' or compose from first name + last name
+            naam_val = None
+            if r.get("naam") is not None:
+                naam_val = r.get("naam")
+            else:
+                first = (
+                    r.get("voornaam")
+                    or r.get("eerstevoornaam")
+                    or r.get("voorletters")
+                    or ""
+                )
+                last = (
+                    r.get("achternaam") or r.get("significantdeelvandeachternaam") or ""
                 )
+                combined = f"{first} {last}".strip()
+                if combined:
+                    naam_val = combined
+            data["Naam"] = str(naam_val).strip() if naam_val is not None else ""
+
+            gebo_val = r.get("geboortedatum")
+            if gebo_val is None:
+                data["Geb_datum"] = ""
+            elif isinstance(gebo_val, int | float) or (
+                isinstance(gebo_val, str) and gebo_val.isdigit()
+            ):
+                data["Geb_datum"] = excel_serial_to_yyyymmdd(
+                    gebo_val, date1904=date1904
+                )
+            else:
+                data["Geb_datum"] = _format_date_yyyymmdd(gebo_val)
+
+            # Melding Ziekte fields
+            dae_val = r.get("dateersteaodag")
+            if dae_val is None:
+                data["DatEersteAoDag"] = ""
+            elif isinstance(dae_val, int | float) or (
+                isinstance(dae_val, str) and dae_val.isdigit()
+            ):
+                data["DatEersteAoDag"] = excel_serial_to_yyyymmdd(
+                    dae_val, date1904=date1904
+                )
+            else:
+                data["DatEersteAoDag"] = _format_date_yyyymmdd(dae_val)
+            v = r.get("inddirecteuitkering")
+            data["IndDirecteUitkering"] = str(v).strip() if v is not None else ""
+            v = r.get("cdredenaangifteao")
+            data["CdRedenAangifteAo"] = str(v).strip() if v is not None else ""
+            v = r.get("cdredenziekmelding")
+            data["CdRedenZiekmelding"] = str(v).strip() if v is not None else ""
+            v = r.get("indwerkdagopzaterdag")
+            data["IndWerkdagOpZaterdag"] = str(v).strip() if v is not None else ""
+            v = r.get("indwerkdagopzondag")
+            data["IndWerkdagOpZondag"] = str(v).strip() if v is not None else ""
+
+            # Basic validation
+            if not data["BSN"] or not data["Naam"]:
+                errors.append(f"Regel {row_index}: ontbrekende BSN of Naam; overslaan")
+                continue
 
-            header_norm = {i: norm(headers[i]) for i in range(len(headers))}
-            for i, val in enumerate(row):
-                key = header_norm.get(i, "")
-                if key:
-                    r[key] = val
-
-        # map to required keys
-        data = {}
-        # Accept several aliases for BSN
-        bsn_val = None
-        for candidate in (
-            "bsn",
-            "burgerservicenr",
-            "burgerservicenummer",
-            "burgerservicenr",
-        ):
-            if r.get(candidate) is not None:
-                bsn_val = r.get(candidate)
-                break
-        data["BSN"] = str(bsn_val).strip() if bsn_val is not None else ""
-
-        # Name: accept direct 'naam' or compose from first name + last name
-        naam_val = None
-        if r.get("naam") is not None:
-            naam_val = r.get("naam")
-        else:
-            first = (
-                r.get("voornaam")
-                or r.get("eerstevoornaam")
-                or r.get("voorletters")
-                or ""
-            )
-            last = r.get("achternaam") or r.get("significantdeelvandeachternaam") or ""
-            combined = f"{first} {last}".strip()
-            if combined:
-                naam_val = combined
-        data["Naam"] = str(naam_val).strip() if naam_val is not None else ""
-
-        gebo_val = r.get("geboortedatum")
-        if gebo_val is None:
-            data["Geb_datum"] = ""
-        elif isinstance(gebo_val, int | float) or (
-            isinstance(gebo_val, str) and gebo_val.isdigit()
-        ):
-            data["Geb_datum"] = excel_serial_to_yyyymmdd(gebo_val, date1904=date1904)
-        else:
-            data["Geb_datum"] = _format_date_yyyymmdd(gebo_val)
-
-        # Melding Ziekte fields
-        dae_val = r.get("dateersteaodag")
-        if dae_val is None:
-            data["DatEersteAoDag"] = ""
-        elif isinstance(dae_val, int | float) or (
-            isinstance(dae_val, str) and dae_val.isdigit()
-        ):
-            data["DatEersteAoDag"] = excel_serial_to_yyyymmdd(
-                dae_val, date1904=date1904
-            )
-        else:
-            data["DatEersteAoDag"] = _format_date_yyyymmdd(dae_val)
-        v = r.get("inddirecteuitkering")
-        data["IndDirecteUitkering"] = str(v).strip() if v is not None else ""
-        v = r.get("cdredenaangifteao")
-        data["CdRedenAangifteAo"] = str(v).strip() if v is not None else ""
-        v = r.get("cdredenziekmelding")
-        data["CdRedenZiekmelding"] = str(v).strip() if v is not None else ""
-        v = r.get("indwerkdagopzaterdag")
-        data["IndWerkdagOpZaterdag"] = str(v).strip() if v is not None else ""
-        v = r.get("indwerkdagopzondag")
-        data["IndWerkdagOpZondag"] = str(v).strip() if v is not None else ""
-
-        # Basic validation
-        if not data["BSN"] or not data["Naam"]:
-            errors.append(f"Regel {row_index}: ontbrekende BSN of Naam; overslaan")
-            continue
+            unique_suffix = f"{batch_ts}_{row_index}"
+            data["CdBerichtType"] = aanvraag_type
+            data["BronApplicatie"] = aanvraag_type
+            tree = fill_xml_template(None, data, unique_suffix)
+            root = tree.getroot()
+            # XSD validation for legacy flow
+            schema = _load_message_xsd()
+            if schema is not None:
+                try:
+                    xml_bytes = etree.tostring(root, encoding="utf-8")
+                    lroot = etree.fromstring(xml_bytes)
+                    if not schema.validate(lroot):
+                        le = schema.error_log
+                        msgs = [str(e.message) for e in le]
+                        errors.append(
+                            f"Regel {row_index}: XSD fouten: {'; '.join(msgs)}"
+                        )
+                        continue
+                except Exception as ve:
+                    errors.append(f"Regel {row_index}: XSD validatiefout: {ve}")
+                    continue
 
-        unique_suffix = (
-            datetime.datetime.now().strftime("%Y%m%d%H%M%S") + f"_{row_index}"
-        )
-        data["CdBerichtType"] = aanvraag_type
-        data["BronApplicatie"] = aanvraag_type
-        tree = fill_xml_template(None, data, unique_suffix)
-        root = tree.getroot()
-        # XSD validation for legacy flow
-        schema = _load_message_xsd()
-        if schema is not None:
+            # Set the MeldingZiekte fields on every matching element, or append them
+            # to the root when the template has none; one walk covers all fields
+            updates = {}
+            for tag in _LEGACY_ROW_FIELDS:
+                val = data.get(tag)
+                if val is not None and val != "":
+                    updates[tag] = str(val)
+            if updates:
+                found = set()
+                for elem in root.iter(*updates):
+                    elem.text = updates[elem.tag]
+                    found.add(elem.tag)
+                for tag, val in updates.items():
+                    if tag not in found:
+                        etree.SubElement(root, tag).text = val
+
+            filename = f"aanvraag_{aanvraag_type}_{unique_suffix}.xml"
+            xml_bytes = etree.tostring(tree, encoding="UTF-8", xml_declaration=True)
             try:
-                xml_bytes = etree.tostring(root, encoding="utf-8")
-                lroot = etree.fromstring(xml_bytes)
-                if not schema.validate(lroot):
-                    le = schema.error_log
-                    msgs = [str(e.message) for e in le]
-                    errors.append(f"Regel {row_index}: XSD fouten: {'; '.join(msgs)}")
-                    continue
-            except Exception as ve:
-                errors.append(f"Regel {row_index}: XSD validatiefout: {ve}")
+                save_xml(xml_bytes, aanvraag_type, filename, events)
+                generated.append(filename)
+            except Exception as e:
+                errors.append(f"Regel {row_index}: fout bij opslaan {e}")
                 continue
 
-        def add_or_set(tag, val):
-            if val is None or val == "":
-                return
-            for elem in root.iter(tag):
-                elem.text = str(val)
-            if not any(True for _ in root.iter(tag)):
-                etree.SubElement(root, tag).text = str(val)
-
-        add_or_set("DatEersteAoDag", data.get("DatEersteAoDag"))
-        add_or_set("IndDirecteUitkering", data.get("IndDirecteUitkering"))
-        add_or_set("CdRedenAangifteAo", data.get("CdRedenAangifteAo"))
-        add_or_set("CdRedenZiekmelding", data.get("CdRedenZiekmelding"))
-        add_or_set("IndWerkdagOpZaterdag", data.get("IndWerkdagOpZaterdag"))
-        add_or_set("IndWerkdagOpZondag", data.get("IndWerkdagOpZondag"))
-
-        filename = f"aanvraag_{aanvraag_type}_{unique_suffix}.xml"
-        try:
-            save_xml(tree, aanvraag_type, filename)
-            generated.append(filename)
-        except Exception as e:
-            errors.append(f"Regel {row_index}: fout bij opslaan {e}")
-
-    # Close workbook
-    try:
-        wb.close()
-    except Exception:
-        pass
+            # Add the file to the ZIP archive for convenience
+            if zip_ok:
+                try:
+                    if zf is None:
+                        ts = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+                        bulk_zip_name = f"bulk_{aanvraag_type}_{ts}.zip"
+                        # Create zip in central DOWNLOADS_DIR so download route can
+                        # serve it
+                        DOWNLOADS_DIR.mkdir(parents=True, exist_ok=True)
+                        zf = ZipFile(
+                            str(DOWNLOADS_DIR / bulk_zip_name),
+                            "w",
+                            ZIP_DEFLATED,
+                            compresslevel=_ZIP_COMPRESSLEVEL,
+                        )
+                    zf.writestr(filename, xml_bytes)
+                except Exception:
+                    zip_ok = False
+    finally:
+        _write_xml_events(events)
 
-    # If we generated files, create a ZIP archive for convenience
-    bulk_zip_name = None
-    if generated:
+        # Close workbook
         try:
-            from zipfile import ZIP_DEFLATED, ZipFile
-
-            ts = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-            bulk_zip_name = f"bulk_{aanvraag_type}_{ts}.zip"
-            # Create zip in central DOWNLOADS_DIR so download route can serve it
-            DOWNLOADS_DIR.mkdir(parents=True, exist_ok=True)
-            zip_path = DOWNLOADS_DIR / bulk_zip_name
-            with ZipFile(str(zip_path), "w", ZIP_DEFLATED) as zf:
-                for fn in generated:
-                    # Search in output directory
-                    p = get_output_directory() / fn
-                    if p.exists():
-                        zf.write(str(p), arcname=fn)
-            # Also include zip name in generated list for template convenience
+            wb.close()
         except Exception:
-            bulk_zip_name = None
+            pass
+
+        if zf is not None:
+            try:
+                zf.close()
+            except Exception:
+                zip_ok = False
+
+    if not zip_ok:
+        bulk_zip_name = None
 
     # Render same template with summary
     yaml_candidate = Path(__file__).parent.parent / "docs" / "excel_datasets.yml"
@@ -1666,31 +1834,8 @@ def upload_excel():
 @app.route("/genereer_xml/fragment")
 def genereer_xml_fragment():
     """Fragment van de resultatenlijst voor AJAX refresh."""
-    generated = []
-    try:
-        out_dir = get_output_directory()
-        if out_dir.exists():
-            for f in out_dir.glob("*.xml"):
-                try:
-                    generated.append(
-                        {
-                            "tijdstip": datetime.datetime.fromtimestamp(
-                                f.stat().st_mtime
-                            ).isoformat(),
-                            "filename": f.name,
-                            "output_path": str(f),
-                            "size": f.stat().st_size,
-                        }
-                    )
-                except Exception:
-                    continue
-        generated = sorted(
-            generated, key=lambda x: x.get("tijdstip") or "", reverse=True
-        )
-    except Exception:
-        generated = []
-    events_file = Path(__file__).parent / "xml_events.jsonl"
-    success_rate = _get_success_rate(events_file)
+    generated = _list_generated_xml(get_output_directory())
+    success_rate = _get_success_rate(EVENTS_FILE)
     zip_limits = {
         "max_files": ZIP_MAX_FILES,
         "max_total_bytes": ZIP_MAX_TOTAL_SIZE,
@@ -1708,31 +1853,8 @@ def genereer_xml_fragment():
 @app.route("/genereer_xml_json/fragment")
 def genereer_json_fragment():
     """Fragment van de resultatenlijst voor AJAX refresh (JSON workflow)."""
-    generated = []
-    try:
-        out_dir = get_output_directory()
-        if out_dir.exists():
-            for f in out_dir.glob("*.xml"):
-                try:
-                    generated.append(
-                        {
-                            "tijdstip": datetime.datetime.fromtimestamp(
-                                f.stat().st_mtime
-                            ).isoformat(),
-                            "filename": f.name,
-                            "output_path": str(f),
-                            "size": f.stat().st_size,
-                        }
-                    )
-                except Exception:
-                    continue
-        generated = sorted(
-            generated, key=lambda x: x.get("tijdstip") or "", reverse=True
-        )
-    except Exception:
-        generated = []
-    events_file = Path(__file__).parent / "xml_events.jsonl"
-    success_rate = _get_success_rate(events_file)
+    generated = _list_generated_xml(get_output_directory())
+    success_rate = _get_success_rate(EVENTS_FILE)
     zip_limits = {
         "max_files": ZIP_MAX_FILES,
         "max_total_bytes": ZIP_MAX_TOTAL_SIZE,
@@ -1763,17 +1885,22 @@ def upload_xml_validatie():
         flash("Geen bestand geselecteerd", "danger")
         return redirect(url_for("index"))
     try:
-        content = bestand.read()
-        doc = etree.parse(io.BytesIO(content))
+        # libxml2 reads the upload stream directly, without a bytes copy; the
+        # parser keeps per-parse state, so each request gets its own: no entity
+        # expansion or network access
+        parser = etree.XMLParser(resolve_entities=False, no_network=True)
+        doc = etree.parse(bestand.stream, parser)
         xsd_path = (
             Path(__file__).parent.parent
             / "docs"
             / "UwvZwMeldingInternBody-v0428-b01.xsd"
         )
         if xsd_path.exists():
-            schema_doc = etree.parse(str(xsd_path))
             try:
-                schema = etree.XMLSchema(schema_doc)
+                # compiled from the XSD document parsed once per process
+                schema = _request_message_xsd()
+                if schema is None:
+                    raise RuntimeError(_LAST_XSD_ERROR or "XSD kon niet worden geladen")
                 if schema.validate(doc):
                     flash(
                         f'Bestand "{bestand.filename}" is geldig en voldoet aan het XSD.',
@@ -1794,22 +1921,103 @@ def upload_xml_validatie():
     return redirect(url_for("index"))
 
 
-def _read_xml_events(limit: int | None = None):
-    """Read `web/xml_events.jsonl` and return a list of event dicts (newest first)."""
-    events_file = Path(__file__).parent / "xml_events.jsonl"
-    if not events_file.exists():
-        return []
+# Bytes read per step when scanning the events log backwards
+_EVENTS_TAIL_BLOCK = 64 * 1024
+
+# `success` values that older writers used for a passed generation
+_TRUE = frozenset((True, "True", "true", 1, "1"))
+
+
+def _load_event(line) -> dict:
+    """Parse one log line, normalizing `success` to a real bool."""
+    ev = _event_loads(line)
+    ev["success"] = ev.get("success") in _TRUE
+    return ev
+
+
+def _tail_xml_events(events_file: Path, limit: int) -> list:
+    """Return the last `limit` parseable events of the log, in file order.
+
+    The log is append-only, so the newest events are at the end; reading it
+    backwards in blocks costs O(limit) instead of O(log size).
+    """
+    loads = _load_event
     out = []
-    try:
-        with open(events_file, encoding="utf-8") as fh:
-            for line in fh:
+    with open(events_file, "rb") as fh:
+        pos = fh.seek(0, os.SEEK_END)
+        rest = b""
+        while pos > 0 and len(out) < limit:
+            step = min(_EVENTS_TAIL_BLOCK, pos)
+            pos -= step
+            fh.seek(pos)
+            lines = (fh.read(step) + rest).split(b"\n")
+            # the first piece is only a whole line once the start is reached
+            rest = lines.pop(0) if pos > 0 else b""
+            for line in reversed(lines):
                 try:
-                    import json as _json
-
-                    ev = _json.loads(line)
-                    out.append(ev)
+                    out.append(loads(line))
                 except Exception:
                     continue
+                if len(out) == limit:
+                    break
+    out.reverse()
+    return out
+
+
+def _parse_xml_events(fh) -> tuple[list, bool]:
+    """Parse the remaining lines of the open log `fh`, skipping unreadable ones.
+
+    Also reports whether the data ended on a newline, i.e. no write was caught
+    halfway.
+    """
+    out = []
+    # both loaders take the UTF-8 bytes as they are; bound once for the loop
+    loads, append = _load_event, out.append
+    line = b"\n"
+    for line in fh:
+        try:
+            append(loads(line))
+        except Exception:
+            continue
+    return out, line.endswith(b"\n")
+
+
+# (st_mtime_ns, bytes parsed, events newest first, st_ino) of the last full read;
+# the dashboard polls several endpoints, which then share one parse per change
+_XML_EVENTS_CACHE: dict[str, tuple[int, int, list, int]] = {}
+
+
+def _read_xml_events(limit: int | None = None):
+    """Read `web/xml_events.jsonl` and return a list of event dicts (newest first).
+
+    The full list is cached per file version and shared between callers, so the
+    returned list and its dicts must be treated as read-only. The log is only
+    ever appended to, so after a write just the new lines are parsed.
+    """
+    events_file = EVENTS_FILE
+    try:
+        st = events_file.stat()
+    except OSError:
+        return []
+    key = str(events_file)
+    cached = _XML_EVENTS_CACHE.get(key)
+    if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2] if limit is None else cached[2][:limit]
+    grown = cached is not None and cached[3] == st.st_ino and cached[1] < st.st_size
+    complete = False
+    try:
+        if grown:
+            with open(events_file, "rb") as fh:
+                fh.seek(cached[1])
+                out, complete = _parse_xml_events(fh)
+                end = fh.tell()
+            out += cached[2]
+        elif limit is not None:
+            out = _tail_xml_events(events_file, limit)
+        else:
+            with open(events_file, "rb") as fh:
+                out, complete = _parse_xml_events(fh)
+                end = fh.tell()
     except Exception:
         return []
     # sort newest first by tijdstip if present
@@ -1817,15 +2025,45 @@ def _read_xml_events(limit: int | None = None):
         out.sort(key=lambda e: e.get("tijdstip") or e.get("datum") or "", reverse=True)
     except Exception:
         pass
+    if complete:
+        _XML_EVENTS_CACHE[key] = (st.st_mtime_ns, end, out, st.st_ino)
     if limit is not None:
         return out[:limit]
     return out
 
 
+def _events_etag(*parts) -> str:
+    """Validator for a response built from the events log (and `parts`)."""
+    try:
+        st = EVENTS_FILE.stat()
+        version = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+    except OSError:
+        version = "0"
+    return "-".join((version, *map(str, parts)))
+
+
+def _revalidate(resp, etag: str):
+    """Tag `resp` so clients re-check it with If-None-Match on every poll."""
+    resp.set_etag(etag, weak=True)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+def _not_modified(etag: str):
+    """Return a 304 when the client already holds `etag`, otherwise None."""
+    if request.if_none_match.contains_weak(etag):
+        return _revalidate(app.response_class(status=304), etag)
+    return None
+
+
 @app.route("/api/xml/events")
 def api_xml_events():
     """Return events for a given date (query param `date=YYYY-MM-DD`)."""
     dateq = request.args.get("date")
+    etag = _events_etag()
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
     evs = _read_xml_events()
     if dateq:
         filtered = [
@@ -1838,104 +2076,177 @@ def api_xml_events():
         ]
     else:
         filtered = evs
-    return jsonify({"events": filtered}), 200
+    return _revalidate(jsonify({"events": filtered}), etag), 200
 
 
-@app.route("/api/xml/throughput")
-@app.route("/api/xml-stats")
-def api_xml_throughput():
-    """Return aggregated throughput per day for the last `days` days (default 14).
-
-    Response shape: {"aggregated": [ {datum, totaal, geslaagd, gefaald, succes_percentage}, ... ] }
-    """
+def _requested_days() -> int:
+    """The `days` query parameter of the throughput views (default 14)."""
     try:
-        days = int(request.args.get("days", "14"))
+        return int(request.args.get("days", "14"))
     except Exception:
-        days = 14
-    events = _read_xml_events()
-    # build counts per date
-    from collections import defaultdict
+        return 14
+
+
+def _aggregate_throughput(events: list, days: int, today: datetime.date) -> list:
+    """Per-day totals for the `days` days up to `today` (oldest -> newest)."""
+    # ISO keys straight from the day ordinals (not before 0001-01-01)
+    last = today.toordinal()
+    fromordinal = datetime.date.fromordinal
+    day_keys = [
+        fromordinal(o).isoformat() for o in range(max(1, last - days + 1), last + 1)
+    ]
+    window = set(day_keys)
 
-    counts = defaultdict(lambda: {"totaal": 0, "geslaagd": 0, "gefaald": 0})
+    # build counts per date; the whole list is scanned, as events that are out
+    # of order or carry an unreadable timestamp must not end the window early
+    totaal_c, geslaagd_c = Counter(), Counter()
     for e in events:
-        tijd = e.get("tijdstip") or e.get("datum") or ""
-        if not tijd:
+        get = e.get
+        date = str(get("tijdstip") or get("datum") or "")[:10]
+        if date not in window:
             continue
-        date = tijd[:10]
-        counts[date]["totaal"] += 1
-        if e.get("success") in (True, "True", "true", 1):
-            counts[date]["geslaagd"] += 1
-        else:
-            counts[date]["gefaald"] += 1
-
-    # build ordered list for the requested range (oldest -> newest)
-    import datetime as _dt
-
-    today = _dt.date.today()
-    days_list = [today - _dt.timedelta(days=i) for i in range(days - 1, -1, -1)]
-    aggregated = []
-    for d in days_list:
-        key = d.isoformat()
-        vals = counts.get(key, {"totaal": 0, "geslaagd": 0, "gefaald": 0})
-        totaal = vals.get("totaal", 0)
-        geslaagd = vals.get("geslaagd", 0)
-        gefaald = vals.get("gefaald", 0)
-        succes_pct = None
-        if totaal > 0:
-            try:
-                succes_pct = round((geslaagd / totaal) * 100, 2)
-            except Exception:
-                succes_pct = None
-        aggregated.append(
+        totaal_c[date] += 1
+        if e["success"]:
+            geslaagd_c[date] += 1
+
+    rows = []
+    for key in day_keys:
+        totaal, geslaagd = totaal_c[key], geslaagd_c[key]
+        rows.append(
             {
                 "datum": key,
                 "totaal": totaal,
                 "geslaagd": geslaagd,
-                "gefaald": gefaald,
-                "succes_percentage": succes_pct,
+                "gefaald": totaal - geslaagd,
+                # percentage to 2 decimals, rounded half up in integer arithmetic
+                "succes_percentage": (
+                    (geslaagd * 20000 + totaal) // (2 * totaal) / 100
+                    if totaal
+                    else None
+                ),
             }
         )
-    return jsonify({"aggregated": aggregated}), 200
+    return rows
 
 
-@app.route("/api/test/historie")
-def api_test_historie():
-    # return recent events as an array for the dashboard
-    hist = _read_xml_events(limit=200)
-    # normalize fields expected by the JS
-    norm = []
+def _historie_rows(hist: list) -> list:
+    """Normalize events to the fields the dashboard JS expects."""
+    rows = []
     for e in hist:
-        norm.append(
+        get = e.get
+        rows.append(
             {
-                "tijdstip": e.get("tijdstip") or e.get("datum") or e.get("time") or "",
-                "filename": e.get("filename")
-                or e.get("output_path")
-                or e.get("bestandsnaam")
+                "tijdstip": get("tijdstip") or get("datum") or get("time") or "",
+                "filename": get("filename")
+                or get("output_path")
+                or get("bestandsnaam")
                 or "",
-                "size": e.get("size") or 0,
-                "success": e.get("success") in (True, "True", "true", 1),
+                "size": get("size") or 0,
+                "success": e["success"],
             }
         )
-    return jsonify(norm), 200
+    return rows
 
 
-@app.route("/api/test/laatste")
-def api_test_laatste():
-    hist = _read_xml_events(limit=1)
+def _laatste(hist: list) -> dict:
+    """Status and time of the newest event, or {} for an empty log."""
     if not hist:
-        return jsonify({}), 200
+        return {}
     e = hist[0]
-    status = "Geslaagd" if e.get("success") in (True, "True", "true", 1) else "Gefaald"
-    return (
-        jsonify({"status": status, "datum": e.get("tijdstip") or e.get("datum")}),
-        200,
-    )
+    status = "Geslaagd" if e["success"] else "Gefaald"
+    return {"status": status, "datum": e.get("tijdstip") or e.get("datum")}
+
+
+@app.route("/api/xml/throughput")
+@app.route("/api/xml-stats")
+def api_xml_throughput():
+    """Return aggregated throughput per day for the last `days` days (default 14).
+
+    Response shape::
+
+        {"aggregated": [
+            {datum, totaal, geslaagd, gefaald, succes_percentage}, ...
+        ]}
+    """
+    days = _requested_days()
+    today = datetime.date.today()
+    # the window moves with the date, so that is part of the validator too
+    etag = _events_etag(days, today.toordinal())
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    aggregated = _aggregate_throughput(_read_xml_events(), days, today)
+    return _revalidate(jsonify({"aggregated": aggregated}), etag), 200
+
+
+@app.route("/api/test/historie")
+def api_test_historie():
+    # return recent events as an array for the dashboard
+    etag = _events_etag()
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    norm = _historie_rows(_read_xml_events(limit=200))
+    return _revalidate(jsonify(norm), etag), 200
+
+
+@app.route("/api/test/laatste")
+def api_test_laatste():
+    etag = _events_etag()
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    return _revalidate(jsonify(_laatste(_read_xml_events(limit=1))), etag), 200
 
 
 @app.route("/api/test/totaal")
 def api_test_totaal():
+    etag = _events_etag()
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
     hist = _read_xml_events()
-    return jsonify({"totaal": len(hist)}), 200
+    return _revalidate(jsonify({"totaal": len(hist)}), etag), 200
+
+
+@app.route("/api/test/snapshot")
+def api_test_snapshot():
+    """Everything the dashboard poller shows, from one read of the events log.
+
+    Response shape: {"laatste": {...}, "totaal": n, "aggregated": [...] (see
+    /api/xml/throughput), "historie": [...] (see /api/test/historie)}
+    """
+    days = _requested_days()
+    today = datetime.date.today()
+    etag = _events_etag(days, today.toordinal())
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+    events = _read_xml_events()
+    snapshot = {
+        "laatste": _laatste(events),
+        "totaal": len(events),
+        "aggregated": _aggregate_throughput(events, days, today),
+        "historie": _historie_rows(events[:200]),
+    }
+    return _revalidate(jsonify(snapshot), etag), 200
+
+
+# Static parts of the simulated test result around its timestamp, encoded once
+_UITVOEREN_HEAD, _UITVOEREN_TAIL = (
+    json.dumps(
+        {
+            "success": True,
+            "tijdstip": "@",
+            "uitvoer": "Simulated test run (local)",
+            "foutmeldingen": "",
+        },
+        separators=(",", ":"),
+        sort_keys=True,
+    )
+    .encode()
+    .split(b"@")
+)
 
 
 @app.route("/api/test/uitvoeren", methods=["POST"])
@@ -1945,15 +2256,9 @@ def api_test_uitvoeren():
     This intentionally does not run real tests; it returns a synthetic success
     response so the dashboard UX can be exercised locally.
     """
-    import datetime as _dt
-
-    result = {
-        "success": True,
-        "tijdstip": _dt.datetime.now().isoformat(),
-        "uitvoer": "Simulated test run (local)",
-        "foutmeldingen": "",
-    }
-    return jsonify(result), 200
+    tijdstip = datetime.datetime.now().isoformat().encode()
+    body = b"".join((_UITVOEREN_HEAD, tijdstip, _UITVOEREN_TAIL, b"\n"))
+    return app.response_class(body, mimetype="application/json"), 200
 
 
 def get_output_directory():
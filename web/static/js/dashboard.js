@@ -270,20 +270,20 @@ async function updateDashboardStats() {
     try {
         showChartLoading(true);
 
-        // Parallel fetches for tiles / last test / totals / throughput
-        const [laatsteResp, totaalResp, throughputResp] = await Promise.allSettled([
-            fetch('/api/test/laatste'),
-            fetch('/api/test/totaal'),
-            fetch(`/api/xml/throughput?days=${chartRangeDays}`)
-        ]);
+        // One snapshot for tiles / last test / totals / throughput / recent activity
+        let snapshot = null;
+        try {
+            const snapResp = await fetch(`/api/test/snapshot?days=${chartRangeDays}`);
+            if (snapResp.ok) snapshot = await snapResp.json();
+        } catch (e) { console.debug('snapshot fetch failed', e); }
 
         // Templates
         // Template feature removed; skip templates fetching
 
         // Last test status/time
         try {
-            if (laatsteResp.status === 'fulfilled' && laatsteResp.value.ok) {
-                const lt = await laatsteResp.value.json();
+            if (snapshot) {
+                const lt = snapshot.laatste || {};
                 const statusEl = document.getElementById('last-test-status');
                 const timeEl = document.getElementById('last-test-time');
                 if (statusEl) statusEl.textContent = lt.status || 'Onbekend';
@@ -293,18 +293,16 @@ async function updateDashboardStats() {
 
         // Total tests
         try {
-            if (totaalResp.status === 'fulfilled' && totaalResp.value.ok) {
-                const tt = await totaalResp.value.json();
+            if (snapshot) {
                 const el = document.getElementById('total-tests');
-                if (el) el.textContent = tt.totaal || 0;
+                if (el) el.textContent = snapshot.totaal || 0;
             }
         } catch (e) { console.debug('totaal tests update failed', e); }
 
         // Throughput / chart update
         try {
-            if (throughputResp.status === 'fulfilled' && throughputResp.value.ok) {
-                const body = await throughputResp.value.json();
-                const payload = Array.isArray(body) ? body : (body && Array.isArray(body.aggregated) ? body.aggregated : []);
+            if (snapshot) {
+                const payload = Array.isArray(snapshot.aggregated) ? snapshot.aggregated : [];
                 if (payload.length > 0) {
                     // reuse existing chart updater
                     try { 
@@ -334,12 +332,10 @@ async function updateDashboardStats() {
             }
         } catch (e) { console.debug('throughput update failed', e); }
 
-        // Recent activity: fall back to fetching historie and update result page tiles if present
+        // Recent activity: update result page tiles if present
         try {
-            const histResp = await fetch('/api/test/historie');
-            if (histResp.ok) {
-                const historie = await histResp.json();
-                const histArray = Array.isArray(historie) ? historie : [];
+            if (snapshot) {
+                const histArray = Array.isArray(snapshot.historie) ? snapshot.historie : [];
                 updateRecentActivity(histArray);
                 // Update Resultaten page tiles if present
                 try {
@@ -392,9 +388,8 @@ async function updateDashboardStats() {
 
         // Basic alerts: check latest day failure percentage and throughput drop
         try {
-            if (throughputResp.status === 'fulfilled' && throughputResp.value.ok) {
-                const body = await throughputResp.value.json();
-                const payload = Array.isArray(body) ? body : (body && Array.isArray(body.aggregated) ? body.aggregated : []);
+            if (snapshot) {
+                const payload = Array.isArray(snapshot.aggregated) ? snapshot.aggregated : [];
                 if (payload.length > 1) {
                     const latest = payload[payload.length - 1];
                     if (latest && typeof latest.succes_percentage === 'number') {
@@ -1,9 +1,14 @@
 import datetime
+import functools
 import json
 from pathlib import Path
 
 from lxml import etree
 
+# Day zero of Excel's 1900 and 1904 date systems
+_EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+_EXCEL_EPOCH_1904 = datetime.datetime(1904, 1, 1)
+
 
 def _format_date_yyyymmdd(value) -> str:
     if value is None:
@@ -14,18 +19,16 @@ def _format_date_yyyymmdd(value) -> str:
         if isinstance(value, int | float):
             serial = float(value)
             if serial > 0 and serial < 60000:
-                base = datetime.datetime(1899, 12, 30)
                 try:
-                    dt = base + datetime.timedelta(days=serial)
+                    dt = _EXCEL_EPOCH + datetime.timedelta(days=serial)
                     return dt.strftime("%Y%m%d")
                 except Exception:
                     pass
         if isinstance(value, str) and value.isdigit():
             serial = float(value)
             if serial > 0 and serial < 60000:
-                base = datetime.datetime(1899, 12, 30)
                 try:
-                    dt = base + datetime.timedelta(days=serial)
+                    dt = _EXCEL_EPOCH + datetime.timedelta(days=serial)
                     return dt.strftime("%Y%m%d")
                 except Exception:
                     pass
@@ -68,6 +71,8 @@ def _get_success_rate(events_path: Path) -> str | None:
     return None
 
 
+# Date columns repeat the same serials across rows; each is converted once
+@functools.lru_cache(maxsize=4096)
 def excel_serial_to_yyyymmdd(serial, date1904: bool = False) -> str:
     try:
         serial_f = float(serial)
@@ -76,10 +81,7 @@ def excel_serial_to_yyyymmdd(serial, date1904: bool = False) -> str:
     if serial_f <= 0 or serial_f > 60000:
         return ""
     try:
-        if date1904:
-            base = datetime.datetime(1904, 1, 1)
-        else:
-            base = datetime.datetime(1899, 12, 30)
+        base = _EXCEL_EPOCH_1904 if date1904 else _EXCEL_EPOCH
         dt = base + datetime.timedelta(days=serial_f)
         return dt.strftime("%Y%m%d")
     except Exception: